@@ -1,8 +1,10 @@
+from functools import lru_cache
 
 from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage
 
-from app.config import LLM, settings
+from app import compaction, metrics
+from app.config import get_llm, get_settings
 
 from app.types import Report
 from app.tools import searcher
@@ -10,43 +12,42 @@ from app.tools import searcher
 from app.types import SharedState, Report
 
 from pprint import pprint
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 
-from app.agents.quant_agent import quant_agent
-from app.agents.analyst_agent import analyst_agent
+from app.agents import debate
+from app.agents.quant_agent import QUANT_PROMPT
+from app.agents.analyst_agent import ANALYST_PROMPT
 
 from app.logger import logger
 
-@tool
-def question_quant(question: str) -> str:
+def _ask_quant(question: str) -> str:
     """
         Grill the Quantitative Analyst on his report.
     """
-    logger.info("🤖 CIO agent | 🔨 question quant tool")
-    logger.info(question)
-    prompt = f"This is the CIO. I read your report. My question is {question}."
-    result = quant_agent.invoke({"messages": [HumanMessage(content=prompt)]})
-    answer = result['messages'][-1].content
-    logger.info(f"🤖 CIO agent | 🔨 question quant tool | {answer}")
-    return answer
-
-@tool
-def question_analyst(question: str) -> str:
+    return debate.ask(QUANT_PROMPT, "quant", question)
+
+async def _aask_quant(question: str) -> str:
+    return await debate.aask(QUANT_PROMPT, "quant", question)
+
+def _ask_analyst(question: str) -> str:
     """
         Grill the Market Analyst on her report.
     """
-    logger.info("🤖 CIO agent | 🔨 question analyst tool")
-    logger.info(question)
-    prompt = f"This is the CIO. I read your report. My question is {question}."
-    result = analyst_agent.invoke({"messages": [HumanMessage(content=prompt)]})
-    answer = result['messages'][-1].content
-    logger.info(f"🤖 CIO agent | 🔨 question analyst tool | {answer}")
-    return answer
-
-CIO_agent = create_react_agent(
-    model=LLM,
-    tools=[searcher.google, question_quant, question_analyst],
-    prompt="""
+    return debate.ask(ANALYST_PROMPT, "analyst", question)
+
+async def _aask_analyst(question: str) -> str:
+    return await debate.aask(ANALYST_PROMPT, "analyst", question)
+
+# sync and async implementations, so the tools work under both invoke and ainvoke;
+# budgeting, memoization and sharing in-flight questions happen in app.agents.debate
+question_quant = StructuredTool.from_function(
+    func=_ask_quant, coroutine=_aask_quant, name="question_quant", callbacks=[metrics.tool_callback]
+)
+question_analyst = StructuredTool.from_function(
+    func=_ask_analyst, coroutine=_aask_analyst, name="question_analyst", callbacks=[metrics.tool_callback]
+)
+
+CIO_PROMPT = """
     You are a CIO (Chief Investment Officer) with years of experience in making portfolio allocation decisions for a multi-billion dollar asset management firm.
 
     You receive a quant report, and an analyst report.
@@ -56,7 +57,8 @@ CIO_agent = create_react_agent(
     Refer to the quant and analyst reports when justifying your decision.
 
     You should ask detailed, pointed follow-up questions to the Quant Agent and the Analyst Agent to grill them to make sure their justifications and assumptions are valid.
-    Whenever asking them a question, include their full report after your question.
+    They already have their full report and the data behind it, so only send the question itself.
+    Your questions are limited each month: ask the ones that matter most, and decide once told there are no more.
 
     After deliberating the reports, and some back-and-forth with the Quant and Analyst Agents, 
     you should make a final decision for portfolio allocation (split between equities and bonds), as well as the justification for the decision.
@@ -65,26 +67,39 @@ CIO_agent = create_react_agent(
     
     IMPORTANT NOTE: Ensure that allocation percentages for equities and bonds sum to 1.0 (100%).
 
-    """,
-    response_format=Report,
-    debug=settings.debug
-    )
+    """
 
-def CIO_agent_node(state: SharedState) -> SharedState:
+@lru_cache(maxsize=1)
+def get_CIO_agent():
+    """
+        Builds the CIO ReAct agent on first use.
+    """
+    return create_react_agent(
+        model=get_llm(),
+        tools=[searcher.google, question_quant, question_analyst],
+        prompt=CIO_PROMPT,
+        response_format=Report,
+        pre_model_hook=compaction.agent_hook("cio"),
+        debug=get_settings().debug,
+    )
 
-    logger.info("🤖 CIO agent | was invoked")
+def CIO_input(state: SharedState) -> dict:
+    """
+        Builds the CIO's input messages from the research reports.
+    """
+    return {"messages": [HumanMessage(content=f"""
+        Month: {state.get('current_month')}
 
-    response = CIO_agent.invoke(
-        {"messages": [HumanMessage(content=f"""
         The Quant's report is:
-        {state['quant_report']}
+        {compaction.render_report(state['quant_report'])}
         
         The Analyst's qualitative report is:
-        {state['analyst_report']}
+        {compaction.render_report(state['analyst_report'])}
         
         The previous month's allocation was {state['prev_equity_allocation']} to equities and {state['prev_bond_allocation']} to bonds.
-        """)]} 
-    )
+        """)]}
+
+def CIO_output(response: dict) -> SharedState:
     CIO_report = response['structured_response']
     
     logger.info("🤖 CIO agent | generated report")
@@ -95,6 +110,29 @@ def CIO_agent_node(state: SharedState) -> SharedState:
     
     return {"CIO_report": CIO_report}
 
+def CIO_agent_node(state: SharedState) -> SharedState:
+
+    logger.info("🤖 CIO agent | was invoked")
+
+    # the month's question budget and the reports the questions are answered from
+    token = debate.start(state)
+    try:
+        response = get_CIO_agent().invoke(CIO_input(state))
+    finally:
+        debate.finish(token)
+    return CIO_output(response)
+
+async def aCIO_agent_node(state: SharedState) -> SharedState:
+
+    logger.info("🤖 CIO agent | was invoked")
+
+    token = debate.start(state)
+    try:
+        response = await get_CIO_agent().ainvoke(CIO_input(state))
+    finally:
+        debate.finish(token)
+    return CIO_output(response)
+
 
 if __name__ == "__main__":
     test_state = SharedState(
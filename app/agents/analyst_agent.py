@@ -1,24 +1,21 @@
+from functools import lru_cache
 from typing import Dict, Any
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import tool
 from langchain_core.output_parsers import PydanticOutputParser
 
-from app.config import LLM, settings
+from app import compaction
+from app.config import get_llm, get_settings
 from app.types import Report, SharedState
 
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, ToolMessage
 
 from app.tools.yfinance_api import fetch_and_summarise_ticker
 from app.tools.searcher import google
 
-from app.config import settings
-
 from app.logger import logger
 
-analyst_agent = create_react_agent(
-    model=LLM,
-    tools=[fetch_and_summarise_ticker, google],
-    prompt="""
+ANALYST_PROMPT = """
     You are a Senior Market Analyst Agent, with expertise in qualitative analysis of the markets.
 
     You have 2 primary roles.
@@ -41,17 +38,27 @@ analyst_agent = create_react_agent(
     - Answer the question in detail, with your qualitative justification
 
     ENSURE that you switch roles when asked a question by the CIO. Otherwise, your output should be a structured Report with equity and bond allocations (summing to 1.0) and justification.
-    """,
-    response_format=Report,
-    debug=settings.debug,
-)
-
+    """
+
+@lru_cache(maxsize=1)
+def get_analyst_agent():
+    """
+        Builds the Analyst ReAct agent on first use.
+    """
+    return create_react_agent(
+        model=get_llm(),
+        tools=[fetch_and_summarise_ticker, google],
+        prompt=ANALYST_PROMPT,
+        response_format=Report,
+        pre_model_hook=compaction.agent_hook("analyst"),
+        debug=get_settings().debug,
+    )
 
-def analyst_agent_node(state: SharedState) -> SharedState:
-    
-    logger.info("🤖 ANALYST agent | was invoked")
 
-    
+def analyst_input(state: SharedState) -> dict:
+    """
+        Builds the Analyst's input messages from the month's news.
+    """
     market_month_data = state["market_data"]
 
     # Extract news data
@@ -60,8 +67,7 @@ def analyst_agent_node(state: SharedState) -> SharedState:
     headlines = news.get("headlines", [])
     headlines_text = "\n".join([f"- {headline}" for headline in headlines])    
 
-    response = analyst_agent.invoke(
-    {"messages": [HumanMessage(content=f"""
+    return {"messages": [HumanMessage(content=f"""
     Month: {state.get('current_month', market_month_data.get('month', 'the current month'))}
     
     Market Summary: {summary}
@@ -77,8 +83,8 @@ def analyst_agent_node(state: SharedState) -> SharedState:
 
     Provide a detailed justification for your recommendation based on the news sentiment and market outlook.
     """)]}
-    )
-    
+
+def analyst_output(response: dict) -> SharedState:
     analyst_report = response['structured_response']
     
     logger.info("🤖 ANALYST agent | generated report")
@@ -87,7 +93,24 @@ def analyst_agent_node(state: SharedState) -> SharedState:
     logger.info(analyst_report)
     logger.info("///////////////////////////////////////////////////")
     
-    return {"analyst_report": analyst_report}
+    # the tool results behind the report, so the CIO's questions don't re-fetch them
+    evidence = [message.content for message in response['messages'] if isinstance(message, ToolMessage)]
+
+    return {"analyst_report": analyst_report, "analyst_evidence": evidence}
+
+def analyst_agent_node(state: SharedState) -> SharedState:
+    
+    logger.info("🤖 ANALYST agent | was invoked")
+
+    response = get_analyst_agent().invoke(analyst_input(state))
+    return analyst_output(response)
+
+async def aanalyst_agent_node(state: SharedState) -> SharedState:
+    
+    logger.info("🤖 ANALYST agent | was invoked")
+
+    response = await get_analyst_agent().ainvoke(analyst_input(state))
+    return analyst_output(response)
     
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app import compaction, metrics
+from app.config import get_llm, get_settings
+from app.tokens import count_tokens
+from app.tools.singleflight import tool_calls
+
+from app.logger import logger
+
+# Answers kept across months and runs. The key includes a fingerprint of the report and
+# evidence the answer was given from, so runs whose reports differ (e.g. another
+# starting split) never share answers
+MEMO_SIZE = 1024
+
+
+def normalise_question(question: str) -> str:
+    return " ".join(question.lower().split()).strip(" ?!.")
+
+def fingerprint(report, evidence: list) -> str:
+    """
+        A digest of what a researcher answers from: its report and its evidence.
+    """
+    digest = hashlib.sha256(report.model_dump_json().encode() if report is not None else b"")
+    for item in evidence:
+        digest.update(b"\0" + str(item).encode())
+    return digest.hexdigest()
+
+
+class Debate:
+    """
+        One month of CIO cross-examination: the researchers' reports and evidence the
+        questions are answered from, and the budget they are drawn against.
+
+        Every question that reaches a researcher takes one of `max_questions` and
+        charges its prompt and answer tokens to `max_tokens`. Nothing is asked once the
+        budget is spent or `seconds` have passed since the CIO started; the tools tell
+        the CIO to decide with what it has. Memoized answers are free.
+    """
+
+    def __init__(self, state: dict, max_questions: int, max_tokens: int, seconds: float):
+        self.month = state.get("current_month")
+        self.reports = {"quant": state.get("quant_report"), "analyst": state.get("analyst_report")}
+        self.evidence = {"quant": state.get("quant_evidence") or [], "analyst": state.get("analyst_evidence") or []}
+        self.fingerprints = {agent: fingerprint(self.reports[agent], self.evidence[agent]) for agent in self.reports}
+        self.max_questions = max_questions
+        self.max_tokens = max_tokens
+        self.deadline = time.monotonic() + seconds
+        self.questions = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> Optional[str]:
+        """
+            Takes a question from the budget. Returns why not, if it is spent.
+        """
+        with self._lock:
+            if self.questions >= self.max_questions:
+                return f"the limit of {self.max_questions} questions this month was reached"
+            if self.tokens >= self.max_tokens:
+                return f"the {self.max_tokens}-token debate budget this month was spent"
+            if time.monotonic() >= self.deadline:
+                return "the time allowed for questions this month ran out"
+            self.questions += 1
+            return None
+
+    def charge(self, tokens: int):
+        with self._lock:
+            self.tokens += tokens
+
+    def summary(self) -> str:
+        return f"{self.questions}/{self.max_questions} questions, {self.tokens}/{self.max_tokens} tokens"
+
+
+# The debate of the CIO node running in this context; tool calls inherit it
+current_debate: ContextVar[Optional[Debate]] = ContextVar("current_debate", default=None)
+
+_memo: OrderedDict = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def start(state: dict):
+    """
+        Opens the month's debate for the CIO node, with the budget from settings.
+        Returns the token to pass to finish().
+    """
+    settings = get_settings()
+    return current_debate.set(Debate(
+        state,
+        max_questions=settings.cio_max_questions,
+        max_tokens=settings.cio_max_debate_tokens,
+        seconds=settings.cio_debate_seconds,
+    ))
+
+def finish(token):
+    debate = current_debate.get()
+    if debate is not None:
+        logger.info(f"🤖 CIO agent | debate used {debate.summary()}")
+    current_debate.reset(token)
+
+def _messages(persona: str, debate: Optional[Debate], agent: str, question: str) -> list:
+    context = ""
+    if debate is not None:
+        settings = get_settings()
+        evidence = compaction.compact_text("\n\n".join(debate.evidence[agent]), settings.debate_evidence_max_tokens) or "None."
+        context = f"""
+        Your report this month was:
+        {compaction.render_report(debate.reports[agent])}
+
+        The data you gathered for it:
+        {evidence}
+
+        Answer from this report and data.
+        """
+    return [
+        SystemMessage(content=persona),
+        HumanMessage(content=f"{context}\nThis is the CIO. I read your report. My question is {question}."),
+    ]
+
+def _usage(messages: list, answer) -> int:
+    usage = getattr(answer, "usage_metadata", None)
+    if usage:
+        return usage["total_tokens"]
+    return sum(count_tokens(message.content) for message in messages) + count_tokens(answer.content)
+
+def _lookup(key) -> Optional[str]:
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    return None
+
+def _remember(key, answer: str):
+    with _memo_lock:
+        _memo[key] = answer
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+
+def _prepare(agent: str, question: str):
+    """
+        The memo key, plus the memoized answer or the reason the budget refuses the question.
+        Questions asked outside a debate have no report to answer from, and are not memoized.
+    """
+    debate = current_debate.get()
+    if debate is None:
+        return None, (agent, None, None, normalise_question(question)), None
+    key = (agent, debate.month, debate.fingerprints[agent], normalise_question(question))
+    answer = _lookup(key)
+    metrics.record_cache("debate", hit=answer is not None)
+    if answer is not None:
+        logger.info(f"🤖 CIO agent | 🔨 question {agent} tool | answered from memo")
+        return debate, key, answer
+    refusal = debate.reserve()
+    if refusal:
+        logger.info(f"🤖 CIO agent | 🔨 question {agent} tool | refused, {refusal}")
+        return debate, key, f"No more questions: {refusal}. Make your decision with the reports you have."
+    return debate, key, None
+
+def ask(persona: str, agent: str, question: str) -> str:
+    """
+        Puts the CIO's question to a researcher: one LLM call in the researcher's
+        persona, with its report and evidence as context (no fresh ReAct run, no
+        re-fetching). Identical questions about the same report share one answer.
+    """
+    debate, key, answer = _prepare(agent, question)
+    if answer is not None:
+        return answer
+
+    def run() -> str:
+        messages = _messages(persona, debate, agent, question)
+        response = get_llm().invoke(messages)
+        if debate is not None:
+            debate.charge(_usage(messages, response))
+        return response.content
+
+    logger.info(f"🤖 CIO agent | 🔨 question {agent} tool")
+    logger.info(question)
+    answer = tool_calls.do(f"question_{agent}", key, run)
+    if debate is not None:
+        _remember(key, answer)
+    logger.info(f"🤖 CIO agent | 🔨 question {agent} tool | {answer}")
+    return answer
+
+async def aask(persona: str, agent: str, question: str) -> str:
+    debate, key, answer = _prepare(agent, question)
+    if answer is not None:
+        return answer
+
+    async def run() -> str:
+        messages = _messages(persona, debate, agent, question)
+        response = await get_llm().ainvoke(messages)
+        if debate is not None:
+            debate.charge(_usage(messages, response))
+        return response.content
+
+    logger.info(f"🤖 CIO agent | 🔨 question {agent} tool")
+    logger.info(question)
+    answer = await tool_calls.ado(f"question_{agent}", key, run)
+    if debate is not None:
+        _remember(key, answer)
+    logger.info(f"🤖 CIO agent | 🔨 question {agent} tool | {answer}")
+    return answer
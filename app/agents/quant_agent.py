@@ -1,7 +1,10 @@
+import asyncio
+from functools import lru_cache
 from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from app.config import LLM
+from app import compaction, indicators, metrics
+from app.config import get_llm, get_settings
 from app.types import Report
 from app.types import SharedState
 from langchain_core.messages import HumanMessage
@@ -10,11 +13,10 @@ from app.tools import yfinance_api
 
 from app.logger import logger
 
-# Create the Quant Agent
-quant_agent = create_react_agent(
-    model=LLM,
-    tools=[],
-    prompt="""You are a Quantitative Analysis Agent, with expertise in economic indicators and their impact on financial markets.
+# The tickers the Quant always looks at; run_simulation preloads them for the whole run
+QUANT_SYMBOLS = ["SPY", "^IRX"]
+
+QUANT_PROMPT = """You are a Quantitative Analysis Agent, with expertise in economic indicators and their impact on financial markets.
 
     You have 2 primary roles.
     ONE: When given market data, you should analyze economic data (CPI, unemployment, interest rates) for the given month, and then to recommend 
@@ -22,7 +24,7 @@ quant_agent = create_react_agent(
     
     When given market data for a specific month, you should:
      - Analyze the economic indicators using established quantitative models
-     - Calculate key metrics like the Misery Index, Phillips Curve pressure, and Taylor Rule rates
+     - Interpret the pre-computed metrics (Misery Index, real rate, Taylor Rule rate and gap, output gap, momentum, volatility); they are exact, do not recalculate them
      - Consider the previous month's allocation if available
      - Provide a recommendation on equity/bond allocation with detailed quantitative justification
     
@@ -33,30 +35,55 @@ quant_agent = create_react_agent(
      - Answer the question in detail, with your quantitative justification
 
     ENSURE that you switch roles when asked a question by the CIO. Otherwise, your output should be a structured Report with equity and bond allocations (summing to 1.0) and justification.
-    """,
-    response_format=Report,
-)
+    """
 
-def get_indicator_summaries(state: SharedState) -> SharedState:
+# Rules-based allocation (QUANT_MODE=rules): a neutral split, tilted by each signal
+RULES_NEUTRAL_EQUITIES = 0.6
+RULES_MIN_EQUITIES = 0.2
+RULES_MAX_EQUITIES = 0.9
+# (indicator, threshold, equity tilt above the threshold, equity tilt at or below it)
+RULES = [
+    ("momentum_3m", 0.0, 0.10, -0.10),
+    ("volatility", 0.25, -0.10, 0.0),
+    ("real_rate", 2.0, -0.10, 0.0),
+    ("taylor_gap", 1.0, -0.05, 0.0),
+    ("misery_index", 10.0, -0.05, 0.0),
+]
+
+@lru_cache(maxsize=1)
+def get_quant_agent():
     """
-        Uses the yfinance tool (deterministically) to fetch some ticker summaries.
+        Builds the Quant ReAct agent on first use.
     """
+    return create_react_agent(
+        model=get_llm(),
+        tools=[],
+        prompt=QUANT_PROMPT,
+        response_format=Report,
+        pre_model_hook=compaction.agent_hook("quant"),
+    )
 
-    SP500_summary = yfinance_api.fetch_and_summarise_ticker.invoke({"symbol": "SPY", "year": state["year"], "month": state["month"]})
-    IRX_summary = yfinance_api.fetch_and_summarise_ticker.invoke({"symbol": "^IRX", "year": state["year"], "month": state["month"]})
+def get_indicator_summaries(state: SharedState) -> SharedState:
+    """
+        Deterministically summarises the Quant tickers for the state's month.
+        The summaries are read from the table precomputed for the run when there is one.
+    """
+    summaries = []
+    for symbol in QUANT_SYMBOLS:
+        summary = yfinance_api.monthly_summary(symbol, state["year"], state["month"])
+        summaries.append(yfinance_api.format_summary_for_llm(summary, symbol, state["year"], state["month"]))
 
+    SP500_summary, IRX_summary = summaries
     return SP500_summary, IRX_summary
 
-def quant_agent_node(state: SharedState) -> SharedState:
-
-    logger.info("🤖 QUANT agent | was invoked")
-
-    # some deterministic tool calls
-    SP500_summary, IRX_summary = get_indicator_summaries(state)
-    misery_index = state['market_data']['economic_indicators']['unemployment_rate'] + state['market_data']['economic_indicators']['cpi_yoy']
+def quant_input(state: SharedState, SP500_summary: str, IRX_summary: str) -> dict:
+    """
+        Builds the Quant's input messages from the ticker summaries and the month's indicators.
+    """
+    # precomputed for the whole run (see indicators.precompute)
+    month_indicators = indicators.format_indicators_for_llm(indicators.month_indicators(state['market_data']), indent=" " * 12)
 
-    response = quant_agent.invoke(
-        {"messages": [HumanMessage(content=f"""
+    return {"messages": [HumanMessage(content=f"""
 
         Here is some information for your analysis:
 
@@ -67,11 +94,12 @@ def quant_agent_node(state: SharedState) -> SharedState:
             - CPI YoY: {state['market_data']['economic_indicators']['cpi_yoy']}
             - Unemployment Rate: {state['market_data']['economic_indicators']['unemployment_rate']}
             - Fed Rate Decision: {state['market_data']['economic_indicators']['fed_interest_rate_decision']}
-            - Misery index: {misery_index}
+{month_indicators}
     
-        The previous month's allocation was {state['prev_equity_allocation']} to equities and {state['prev_bond_allocation']} to bonds.
-        """)]} 
-    )
+        The previous month's allocation was {state.get('prev_equity_allocation', 'N/A')} to equities and {state.get('prev_bond_allocation', 'N/A')} to bonds.
+        """)]}
+
+def quant_output(response: dict, evidence: list = None) -> SharedState:
     quant_report = response['structured_response']
 
     logger.info("🤖 QUANT agent | generated report")
@@ -80,7 +108,63 @@ def quant_agent_node(state: SharedState) -> SharedState:
     logger.info(quant_report)
     logger.info("///////////////////////////////////////////////////")
     
-    return {"quant_report": quant_report}
+    return {"quant_report": quant_report, "quant_evidence": evidence or []}
+
+def rules_report(month_indicators: dict) -> Report:
+    """
+        A Quant report without the LLM: the neutral split, tilted by every signal that
+        fires (see RULES). Signals without a value (e.g. no price history yet) are skipped.
+    """
+    equities = RULES_NEUTRAL_EQUITIES
+    reasons = []
+    for field, threshold, above, below in RULES:
+        value = month_indicators.get(field)
+        if value is None:
+            continue
+        tilt = above if value > threshold else below
+        equities += tilt
+        reasons.append(f"{field} {value:.4g} {'>' if value > threshold else '<='} {threshold:g}: {tilt:+.2f}")
+    equities = round(min(max(equities, RULES_MIN_EQUITIES), RULES_MAX_EQUITIES), 2)
+    return Report(
+        equities=equities,
+        bonds=round(1 - equities, 2),
+        justification=f"Rules-based allocation from a {RULES_NEUTRAL_EQUITIES:.0%} equity neutral split; "
+                      + ("; ".join(reasons) if reasons else "no signal available") + ".",
+    )
+
+def rules_quant_node(state: SharedState) -> SharedState:
+    """
+        The Quant node in QUANT_MODE=rules: the indicators decide, no LLM is called.
+    """
+    month_indicators = indicators.month_indicators(state["market_data"])
+    quant_report = rules_report(month_indicators)
+    metrics.record_llm_avoided(metrics.AGENT_RUN_ROUND_TRIPS)
+    logger.info(f"📐 QUANT rules | {quant_report.equities:.2f} equities / {quant_report.bonds:.2f} bonds")
+    return {"quant_report": quant_report, "quant_evidence": [indicators.format_indicators_for_llm(month_indicators)]}
+
+def quant_agent_node(state: SharedState) -> SharedState:
+
+    logger.info("🤖 QUANT agent | was invoked")
+    if get_settings().quant_mode == "rules":
+        return rules_quant_node(state)
+
+    # some deterministic tool calls
+    SP500_summary, IRX_summary = get_indicator_summaries(state)
+
+    response = get_quant_agent().invoke(quant_input(state, SP500_summary, IRX_summary))
+    return quant_output(response, [SP500_summary, IRX_summary])
+
+async def aquant_agent_node(state: SharedState) -> SharedState:
+
+    logger.info("🤖 QUANT agent | was invoked")
+    if get_settings().quant_mode == "rules":
+        return rules_quant_node(state)
+
+    # some deterministic tool calls (served from the price store, off the event loop)
+    SP500_summary, IRX_summary = await asyncio.to_thread(get_indicator_summaries, state)
+
+    response = await get_quant_agent().ainvoke(quant_input(state, SP500_summary, IRX_summary))
+    return quant_output(response, [SP500_summary, IRX_summary])
 
 
 if __name__ == "__main__":
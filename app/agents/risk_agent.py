@@ -1,10 +1,13 @@
+from functools import lru_cache
+from typing import Optional
 
 from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage
 
-from app.config import LLM, settings
+from app import compaction, metrics
+from app.config import get_llm, get_settings
 
-from app.types import RiskReport
+from app.types import RiskReport, RiskVerdict
 from app.tools import searcher
 
 from app.types import SharedState, Report
@@ -14,10 +17,7 @@ from langchain_core.tools import tool
 
 from app.logger import logger
 
-risk_agent = create_react_agent(
-    model=LLM,
-    tools=[searcher.google],
-    prompt="""
+RISK_PROMPT = """
     You are a Risk Analyst Agent responsible for identifying risky financial decisions in AI-generated outputs.
 
     You receive a proposed decision, specifically a portfolio allocation (split between equities and bonds), as well as the justification for the decision.
@@ -34,28 +34,83 @@ risk_agent = create_react_agent(
 
     There is financial reputation and billions on the line, not to mention your career. Be extremely critical and direct.
 
-    """,
+    """
 
-    # TODO: Use the read_quant_report and read_analyst_report tools to access the quant and analyst reports if you deem it necessary, or need to go into further depth.
+@lru_cache(maxsize=1)
+def get_risk_agent():
+    """
+        Builds the Risk ReAct agent on first use.
+    """
+    return create_react_agent(
+        model=get_llm(),
+        tools=[searcher.google],
+        prompt=RISK_PROMPT,
 
-    response_format=RiskReport,
-    debug=settings.debug
+        # TODO: Use the read_quant_report and read_analyst_report tools to access the quant and analyst reports if you deem it necessary, or need to go into further depth.
+
+        response_format=RiskReport,
+        pre_model_hook=compaction.agent_hook("risk"),
+        debug=get_settings().debug,
     )
 
 
-def risk_agent_node(state: SharedState) -> SharedState:
+# Allocations are two-decimal fractions; float noise is well below this
+SHIFT_DIGITS = 9
+
+def prescreen(state: SharedState) -> Optional[RiskReport]:
+    """
+        Rules-based verdict for the clear cases the prompt spells out, or None when the
+        decision needs the Risk agent: a split that does not sum to 1, or a drastic
+        shift from the previous allocation, is a Block; a small move (routine holds
+        included) is a Pass. Thresholds come from the RISK_* settings.
+    """
+    settings = get_settings()
+    if not settings.risk_prescreen:
+        return None
 
-    logger.info("🤖 RISK agent | was invoked")
-    
     CIO_report = state['CIO_report']
+    # rounded, so a move that sits exactly on a threshold meets it (0.65 - 0.6 is 0.0500...04)
+    total = round(CIO_report.equities + CIO_report.bonds, SHIFT_DIGITS)
+    if abs(total - 1) > settings.risk_sum_tolerance:
+        return RiskReport(verdict=RiskVerdict.block, reason=f"Pre-screen: the allocations sum to {total:.2f}, not 1.")
+
+    previous = state.get('prev_equity_allocation')
+    if previous is None:
+        return None
+    shift = round(abs(CIO_report.equities - previous), SHIFT_DIGITS)
+    if shift >= settings.risk_block_min_shift:
+        return RiskReport(
+            verdict=RiskVerdict.block,
+            reason=f"Pre-screen: drastic shift of {shift:.2f} in equities (from {previous} to {CIO_report.equities}), "
+                   f"at least the {settings.risk_block_min_shift} limit.",
+        )
+    if shift <= settings.risk_pass_max_shift:
+        return RiskReport(
+            verdict=RiskVerdict.pass_,
+            reason=f"Pre-screen: routine move of {shift:.2f} in equities (from {previous} to {CIO_report.equities}), "
+                   f"within the {settings.risk_pass_max_shift} limit.",
+        )
+    return None
+
+def prescreen_output(risk_report: RiskReport) -> SharedState:
+    metrics.record_llm_avoided(metrics.AGENT_RUN_ROUND_TRIPS)
+    logger.info(f"🛡️ RISK pre-screen | {risk_report.verdict.value} | {risk_report.reason}")
+    return {"risk_report": risk_report}
 
-    response = risk_agent.invoke(
-        {"messages": [HumanMessage(content=f"""
+def risk_input(state: SharedState) -> dict:
+    """
+        Builds the Risk Analyst's input messages from the CIO's decision.
+    """
+    CIO_report = state['CIO_report']
+
+    return {"messages": [HumanMessage(content=f"""
+        Month: {state.get('current_month')}
         The new split is {CIO_report.equities} to equities and {CIO_report.bonds} to bonds.
         The previous split was {state['prev_equity_allocation']} to equities and {state['prev_bond_allocation']} to bonds.
-        The reason is {CIO_report.justification}.
+        The reason is {compaction.compact_text(CIO_report.justification, get_settings().report_max_tokens)}.
         """)]}
-    )
+
+def risk_output(response: dict) -> SharedState:
     risk_report = response['structured_response']
     
     logger.info("🤖 RISK agent | generated report")
@@ -66,6 +121,28 @@ def risk_agent_node(state: SharedState) -> SharedState:
     
     return {"risk_report": risk_report}
 
+def risk_agent_node(state: SharedState) -> SharedState:
+
+    logger.info("🤖 RISK agent | was invoked")
+
+    risk_report = prescreen(state)
+    if risk_report is not None:
+        return prescreen_output(risk_report)
+
+    response = get_risk_agent().invoke(risk_input(state))
+    return risk_output(response)
+
+async def arisk_agent_node(state: SharedState) -> SharedState:
+
+    logger.info("🤖 RISK agent | was invoked")
+
+    risk_report = prescreen(state)
+    if risk_report is not None:
+        return prescreen_output(risk_report)
+
+    response = await get_risk_agent().ainvoke(risk_input(state))
+    return risk_output(response)
+
 if __name__ == "__main__":
     test_state = SharedState(
         market_data="sample_data",
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from app.config import get_settings
+from app.types import HumanApproval, RiskVerdict
+from app.utils import open_sqlite
+
+from app.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS approvals (
+    thread_id   TEXT PRIMARY KEY,
+    request     TEXT NOT NULL,
+    decision    TEXT,
+    created_at  REAL NOT NULL,
+    decided_at  REAL
+);
+CREATE INDEX IF NOT EXISTS approvals_pending ON approvals (decided_at, created_at);
+"""
+
+
+class ApprovalQueue:
+    """
+        Persistent queue of allocations waiting for a human decision.
+
+        The HumanNode puts a request here (keyed on the month's checkpoint thread) and
+        interrupts the graph instead of blocking on input(); the run carries on. A
+        reviewer decides later, from the console, Streamlit or code, and decide()
+        resumes the paused month from its checkpoint.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.executescript(SCHEMA)
+
+    def submit(self, thread_id: str, request: dict):
+        """
+            Queues a request. Re-submitting the same thread (the node re-runs when the
+            graph resumes) keeps the original request and any decision already made.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO approvals (thread_id, request, created_at) VALUES (?, ?, ?)",
+                (thread_id, json.dumps(request), time.time()),
+            )
+
+    def record(self, thread_id: str, decision: HumanApproval):
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE approvals SET decision = ?, decided_at = ? WHERE thread_id = ?",
+                (HumanApproval(decision).value, time.time(), thread_id),
+            ).rowcount
+        if not updated:
+            raise KeyError(f"No approval request for {thread_id!r}")
+
+    def discard(self, thread_ids: list):
+        """
+            Drops the requests (decided or not) of months whose checkpoints were invalidated:
+            they are replayed, and queue a new request if they still need one.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM approvals WHERE thread_id = ?", [(thread_id,) for thread_id in thread_ids])
+
+    def decision(self, thread_id: str) -> Optional[HumanApproval]:
+        with self._lock:
+            row = self._conn.execute("SELECT decision FROM approvals WHERE thread_id = ?", (thread_id,)).fetchone()
+        return HumanApproval(row[0]) if row and row[0] else None
+
+    def pending(self) -> list:
+        """
+            Undecided requests, oldest first, each with its thread_id.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, request FROM approvals WHERE decided_at IS NULL ORDER BY created_at"
+            ).fetchall()
+        return [{"thread_id": thread_id, **json.loads(request)} for thread_id, request in rows]
+
+
+@lru_cache(maxsize=1)
+def get_approval_queue() -> ApprovalQueue:
+    return ApprovalQueue(os.path.join(get_settings().cache_dir, "approvals.sqlite"))
+
+# ============ POLICY ===============
+
+def approval_request(state) -> dict:
+    """
+        What a reviewer needs to decide on a month: the proposal, the verdict and the move.
+    """
+    return {
+        "month": state.get("current_month"),
+        "verdict": state["risk_report"].verdict.value,
+        "reason": state["risk_report"].reason,
+        "equities": state["CIO_report"].equities,
+        "bonds": state["CIO_report"].bonds,
+        "prev_equities": state.get("prev_equity_allocation"),
+        "prev_bonds": state.get("prev_bond_allocation"),
+    }
+
+def policy_decision(state) -> Optional[HumanApproval]:
+    """
+        The configured unattended decision, if any: a Warn whose equity shift is under
+        AUTO_APPROVE_WARN_MAX_SHIFT is approved, and a Block is rejected when
+        AUTO_REJECT_BLOCK is set. None means a human has to decide.
+    """
+    settings = get_settings()
+    verdict = state["risk_report"].verdict
+    if verdict == RiskVerdict.block and settings.auto_reject_block:
+        return HumanApproval.reject
+    if verdict == RiskVerdict.warn and state.get("prev_equity_allocation") is not None:
+        shift = abs(state["CIO_report"].equities - state["prev_equity_allocation"])
+        if shift < settings.auto_approve_warn_max_shift:
+            return HumanApproval.approve
+    return None
+
+# ============ REVIEW ===============
+
+# called with the thread id of every decided month, once it has been resumed
+_decision_listeners = []
+
+def on_decision(listener):
+    """
+        Registers `listener(thread_id)`, called after each decide() in this process,
+        e.g. so the engine refreshes a cached run whose month was decided.
+    """
+    _decision_listeners.append(listener)
+
+def decide(thread_id: str, decision: HumanApproval):
+    """
+        Records a decision and resumes the paused month, which runs its HumanNode and
+        ExecutionNode from the checkpoint. Returns the month's final state.
+
+        The later months of the run were booked holding the split from before the
+        decision, so their checkpoints (and approval requests) are dropped: resume(run_id)
+        replays them from the decided month on.
+    """
+    from langgraph.types import Command
+
+    from app import checkpoints
+    from app.main import get_graph
+
+    decision = HumanApproval(decision)
+    queue = get_approval_queue()
+    queue.record(thread_id, decision)
+    logger.info(f"👱‍♂️ HUMAN APPROVAL | {thread_id} | {decision.value} was selected")
+    final_state = get_graph(checkpointed=True).invoke(Command(resume=decision.value), {"configurable": {"thread_id": thread_id}})
+    queue.discard(checkpoints.invalidate_later_months(thread_id))
+    for listener in _decision_listeners:
+        listener(thread_id)
+    return final_state
+
+def review_pending():
+    """
+        Console helper: walks through every pending approval and decides it.
+    """
+    choices = {"1": HumanApproval.approve, "0": HumanApproval.reject, "X": HumanApproval.try_again}
+    pending = get_approval_queue().pending()
+    if not pending:
+        print("👱‍♂️ HUMAN APPROVAL | nothing to review")
+    for request in pending:
+        print(f"👱‍♂️ HUMAN APPROVAL | {request['month']} ({request['thread_id']}) | risk verdict: {request['verdict']}")
+        print(f"Reason: {request['reason']}")
+        print(f"The proposed split is {request['equities']} equities / {request['bonds']} bonds "
+              f"(previously {request['prev_equities']} / {request['prev_bonds']})")
+        print("[ 1 ] Approve")
+        print("[ 0 ] Reject")
+        print("[ X ] Try again")
+        print("[ S ] Skip")
+        while True:
+            human_input = input("Enter your decision: ")
+            if human_input == "S" or human_input in choices:
+                break
+            print("Invalid input, please try again")
+        if human_input in choices:
+            decide(request["thread_id"], choices[human_input])
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+from app.price_store import get_price_store
+from app.utils import month_bounds
+
+from app.logger import logger
+
+# Tradable proxies for the two asset classes the agents allocate between
+EQUITY_PROXY = "SPY"
+BOND_PROXY = "IEF"
+
+TRADING_DAYS = 252
+ASSETS = ["equities", "bonds"]
+
+
+def daily_returns(start, end, equity_proxy: str = EQUITY_PROXY, bond_proxy: str = BOND_PROXY) -> pd.DataFrame:
+    """
+        Daily close-to-close returns of the equity and bond proxies in [start, end),
+        read from the price store (and its in-memory panel when the run preloaded it).
+
+        Returns:
+            pd.DataFrame: Date-indexed frame with 'equities' and 'bonds' columns.
+    """
+    store = get_price_store()
+    start = pd.Timestamp(start)
+    # a few days of lookback, so the first day in the window has a previous close
+    lookback = start - timedelta(days=7)
+    closes = pd.concat(
+        {
+            "equities": store.get(equity_proxy, lookback, end)["Close"],
+            "bonds": store.get(bond_proxy, lookback, end)["Close"],
+        },
+        axis=1,
+    ).dropna()
+    returns = closes.pct_change().iloc[1:]
+    returns = returns[returns.index >= start]
+    if returns.empty:
+        raise ValueError(f"No price data for {equity_proxy}/{bond_proxy} between {start.date()} and {end}")
+    return returns
+
+
+def run_backtest(
+    returns: pd.DataFrame,
+    allocations: pd.DataFrame,
+    capital: float = 1000,
+    initial_allocation: tuple = (0.6, 0.4),
+    risk_free_rate: float = 0.0,
+) -> dict:
+    """
+        Vectorised monthly-rebalanced backtest.
+
+        An allocation decided in month M (with month M's news and prices) is put on at
+        the start of month M+1 and left to drift until the next rebalance. Months before
+        the first decision hold `initial_allocation`. Any weight not allocated sits in
+        cash at zero return.
+
+        Args:
+            returns (pd.DataFrame): Daily returns with 'equities' and 'bonds' columns, Date index.
+            allocations (pd.DataFrame): 'equities'/'bonds' weights indexed by decision month (Period).
+            capital (float): Starting capital.
+            initial_allocation (tuple): (equities, bonds) held before the first decision.
+            risk_free_rate (float): Annual risk-free rate used for the Sharpe ratio.
+
+        Returns:
+            dict: 'equity_curve' (pd.Series) and 'metrics' (dict of floats).
+    """
+    returns = returns.sort_index()
+    if returns.empty:
+        # no trading days: capital is carried unchanged
+        metrics = dict.fromkeys(["total_return", "cagr", "volatility", "sharpe", "max_drawdown", "turnover"], 0.0)
+        metrics |= {"final_capital": float(capital), "rebalances": 0}
+        return {"equity_curve": pd.Series(dtype=float, index=returns.index, name="equity"), "metrics": metrics}
+    R = returns[ASSETS].to_numpy(dtype=float)
+
+    # month code of every trading day, and the first/last row of each month
+    codes, months = pd.factorize(returns.index.to_period("M"), sort=True)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:] - 1, len(codes) - 1]
+
+    # weights held in each month: the latest decision taken in an earlier month
+    effective = allocations[ASSETS].astype(float).copy()
+    effective.index = pd.PeriodIndex(effective.index, freq="M") + 1
+    effective = effective[~effective.index.duplicated(keep="last")]
+    W = (
+        effective.reindex(effective.index.union(months)).sort_index().ffill()
+        .reindex(months)
+        .fillna(dict(zip(ASSETS, initial_allocation)))
+        .to_numpy()
+    )
+    cash = 1.0 - W.sum(axis=1)
+
+    # per-asset growth since the month's rebalance, via cumulative log returns
+    cum = np.cumsum(np.log1p(R), axis=0)
+    base = np.where(starts[:, None] > 0, cum[np.maximum(starts - 1, 0)], 0.0)
+    growth = np.exp(cum - base[codes])
+    portfolio_growth = (growth * W[codes]).sum(axis=1) + cash[codes]
+
+    month_growth = portfolio_growth[ends]
+    month_start_capital = capital * np.r_[1.0, np.cumprod(month_growth)[:-1]]
+    equity = month_start_capital[codes] * portfolio_growth
+
+    # metrics
+    previous = np.r_[capital, equity[:-1]]
+    daily = equity / previous - 1.0
+    std = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    excess = daily.mean() - risk_free_rate / TRADING_DAYS
+    drawdown = equity / np.maximum.accumulate(np.r_[capital, equity])[1:] - 1.0
+
+    # one-way turnover at each rebalance: new target vs. the weights the previous month drifted to
+    drifted = growth[ends] * W / month_growth[:, None]
+    rebalance_turnover = 0.5 * (
+        np.abs(W[1:] - drifted[:-1]).sum(axis=1)
+        + np.abs(cash[1:] - cash[:-1] / month_growth[:-1])
+    )
+
+    years = len(daily) / TRADING_DAYS
+    total_return = equity[-1] / capital - 1.0
+    metrics = {
+        "final_capital": float(equity[-1]),
+        "total_return": float(total_return),
+        "cagr": float((1.0 + total_return) ** (1.0 / years) - 1.0) if years > 0 else 0.0,
+        "volatility": float(std * np.sqrt(TRADING_DAYS)),
+        "sharpe": float(excess / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()),
+        "turnover": float(rebalance_turnover.sum() / years) if years > 0 else 0.0,
+        "rebalances": int(len(rebalance_turnover)),
+    }
+
+    equity_curve = pd.Series(equity, index=returns.index, name="equity")
+    return {"equity_curve": equity_curve, "metrics": metrics}
+
+
+def holding_growth(equities: float, bonds: float, year: int, month: int) -> float:
+    """
+        Growth factor of a portfolio holding the given split through one calendar month.
+    """
+    start, end = month_bounds(year, month)
+    try:
+        returns = daily_returns(start, end)
+    except ValueError:
+        # no trading days in the store for the month: capital is carried unchanged
+        logger.warning(f"📉 BACKTEST | no prices for {year}-{month:02d}, holding capital unchanged")
+        return 1.0
+    allocations = pd.DataFrame(columns=ASSETS, index=pd.PeriodIndex([], freq="M"))
+    result = run_backtest(returns, allocations, capital=1.0, initial_allocation=(equities, bonds))
+    return result["metrics"]["final_capital"]
@@ -0,0 +1,243 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
+
+from app.config import get_settings
+from app.utils import open_sqlite
+
+from app.logger import logger
+
+RUNS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS simulation_runs (
+    run_id        TEXT PRIMARY KEY,
+    months_to_run INTEGER NOT NULL,
+    created_at    REAL NOT NULL,
+    completed_at  REAL,
+    initial_state TEXT,
+    start_month   INTEGER NOT NULL DEFAULT 0
+);
+"""
+RUN_FIELDS = ("run_id", "months_to_run", "created_at", "completed_at", "initial_state", "start_month")
+
+
+def checkpoint_path() -> str:
+    return os.path.join(get_settings().cache_dir, "checkpoints.sqlite")
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+def month_config(run_id: str, month_idx: int) -> dict:
+    """
+        The graph config of one month of a run: every month is its own checkpoint
+        thread, so a resumed run knows exactly which months finished and where the
+        interrupted one stopped.
+    """
+    return {"configurable": {"thread_id": f"{run_id}/{month_idx:04d}"}}
+
+# ============ CHECKPOINTERS ===============
+
+@lru_cache(maxsize=1)
+def get_checkpointer():
+    """
+        The process-wide SQLite checkpointer for sync graph runs, or None when
+        checkpointing is disabled.
+    """
+    if not get_settings().checkpoints:
+        return None
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    saver = SqliteSaver(open_sqlite(checkpoint_path()))
+    saver.setup()
+    return saver
+
+@asynccontextmanager
+async def aopen_checkpointer():
+    """
+        An async SQLite checkpointer on the same database, for ainvoke runs
+        (the sync saver cannot be awaited). Yields None when checkpointing is disabled.
+    """
+    if not get_settings().checkpoints:
+        yield None
+        return
+
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    os.makedirs(os.path.dirname(checkpoint_path()) or ".", exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(checkpoint_path()) as saver:
+        yield saver
+
+# ============ RUN REGISTRY ===============
+
+_runs_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _runs():
+    conn = open_sqlite(checkpoint_path())
+    conn.executescript(RUNS_SCHEMA)
+    # registries created before runs could override the initial state
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(simulation_runs)")}
+    if "initial_state" not in columns:
+        conn.execute("ALTER TABLE simulation_runs ADD COLUMN initial_state TEXT")
+    # ... or start after the first month
+    if "start_month" not in columns:
+        conn.execute("ALTER TABLE simulation_runs ADD COLUMN start_month INTEGER NOT NULL DEFAULT 0")
+    return conn
+
+def _run(row) -> dict:
+    run = dict(zip(RUN_FIELDS, row))
+    run["initial_state"] = json.loads(run["initial_state"]) if run["initial_state"] else None
+    return run
+
+def register_run(run_id: str, months_to_run: int, initial_state: Optional[dict] = None, start_month: int = 0):
+    """
+        Records a run, so it can be resumed by id. Registering an existing run is a no-op.
+        `initial_state` holds the run's overrides of the initial state, if any, and
+        `start_month` the index of its first month.
+    """
+    with _runs_lock, _runs():
+        _runs().execute(
+            "INSERT OR IGNORE INTO simulation_runs (run_id, months_to_run, created_at, initial_state, start_month)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (run_id, months_to_run, time.time(), json.dumps(initial_state) if initial_state else None, start_month),
+        )
+
+def start_run(
+    months_to_run: int, run_id: Optional[str] = None, initial_state: Optional[dict] = None, start_month: int = 0,
+) -> Optional[str]:
+    """
+        Registers a new run (or re-opens `run_id`) and returns its id, or None when
+        checkpointing is disabled.
+    """
+    if not get_settings().checkpoints:
+        return None
+    run_id = run_id or new_run_id()
+    register_run(run_id, months_to_run, initial_state, start_month)
+    logger.info(f"♻️ CHECKPOINT | run {run_id} (resume it with resume('{run_id}'))")
+    return run_id
+
+def complete_run(run_id: str):
+    with _runs_lock, _runs():
+        _runs().execute("UPDATE simulation_runs SET completed_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+def reopen_run(run_id: str):
+    with _runs_lock, _runs():
+        _runs().execute("UPDATE simulation_runs SET completed_at = NULL WHERE run_id = ?", (run_id,))
+
+def get_run(run_id: str) -> Optional[dict]:
+    with _runs_lock:
+        row = _runs().execute(
+            f"SELECT {', '.join(RUN_FIELDS)} FROM simulation_runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return _run(row)
+
+def list_runs(unfinished_only: bool = False) -> list:
+    query = f"SELECT {', '.join(RUN_FIELDS)} FROM simulation_runs"
+    if unfinished_only:
+        query += " WHERE completed_at IS NULL"
+    with _runs_lock:
+        rows = _runs().execute(query + " ORDER BY created_at DESC").fetchall()
+    return [_run(row) for row in rows]
+
+def later_months(thread_id: str) -> list:
+    """
+        The checkpoint threads of the months after `thread_id` in the same run (or the
+        same portfolio of a run), in month order.
+    """
+    saver = get_checkpointer()
+    if saver is None:
+        return []
+    prefix, month_idx = thread_id.rsplit("/", 1)
+    with saver.cursor(transaction=False) as cursor:
+        cursor.execute("SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id LIKE ?", (f"{prefix}/%",))
+        threads = [row[0] for row in cursor.fetchall()]
+    later = [
+        thread for thread in threads
+        if thread.rsplit("/", 1)[0] == prefix and thread.rsplit("/", 1)[1].isdigit()
+        and int(thread.rsplit("/", 1)[1]) > int(month_idx)
+    ]
+    return sorted(later)
+
+def invalidate_later_months(thread_id: str) -> list:
+    """
+        Deletes the checkpoints of every month after `thread_id`, and re-opens the run,
+        so resume(run_id) replays those months from the (changed) month before them
+        instead of returning their saved states. Returns the deleted threads.
+        Runs not registered for resume (run_portfolios) are left as they are.
+    """
+    run_id = thread_id.split("/", 1)[0]
+    if get_run(run_id) is None:
+        return []
+    threads = later_months(thread_id)
+    for thread in threads:
+        get_checkpointer().delete_thread(thread)
+    if threads:
+        reopen_run(run_id)
+        logger.info(f"♻️ CHECKPOINT | {len(threads)} months after {thread_id} will be replayed on resume")
+    return threads
+
+# ============ MONTH STEPS ===============
+
+def _invoke(graph, inputs, config: Optional[dict], on_node=None) -> dict:
+    """
+        graph.invoke, or with `on_node` graph.stream: on_node(node, update) is called
+        with each node's state update as the node finishes. Either way the final state
+        is returned, with "__interrupt__" set if the month paused for approval.
+    """
+    if on_node is None:
+        return graph.invoke(inputs, config)
+
+    state, interrupts = None, None
+    for mode, chunk in graph.stream(inputs, config, stream_mode=["updates", "values"]):
+        if mode == "values":
+            state = chunk
+            continue
+        for node, update in chunk.items():
+            if node == "__interrupt__":
+                interrupts = update
+            on_node(node, update)
+    if interrupts:
+        state = {**state, "__interrupt__": interrupts}
+    return state
+
+def run_month(graph, state: dict, config: Optional[dict], on_node=None) -> dict:
+    """
+        Runs one month on its checkpoint thread, picking up where a previous attempt stopped:
+        a month never started runs from `state`, an interrupted one continues from its
+        last completed node, and a finished one returns its saved final state.
+        With `on_node`, node updates are streamed to it as they finish (see _invoke).
+    """
+    if config is None:
+        return _invoke(graph, state, None, on_node)
+
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        return _invoke(graph, state, config, on_node)
+    if snapshot.next:
+        logger.info(f"♻️ CHECKPOINT | resuming {config['configurable']['thread_id']} at {', '.join(snapshot.next)}")
+        return _invoke(graph, None, config, on_node)
+    logger.info(f"♻️ CHECKPOINT | {config['configurable']['thread_id']} already completed")
+    return snapshot.values
+
+async def arun_month(graph, state: dict, config: Optional[dict]) -> dict:
+    """
+        Async twin of run_month.
+    """
+    if config is None:
+        return await graph.ainvoke(state)
+
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values:
+        return await graph.ainvoke(state, config)
+    if snapshot.next:
+        logger.info(f"♻️ CHECKPOINT | resuming {config['configurable']['thread_id']} at {', '.join(snapshot.next)}")
+        return await graph.ainvoke(None, config)
+    logger.info(f"♻️ CHECKPOINT | {config['configurable']['thread_id']} already completed")
+    return snapshot.values
@@ -0,0 +1,112 @@
+from typing import Optional
+
+from langchain_core.messages import AIMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from app import metrics
+from app.config import get_settings
+from app.tokens import count_message_tokens, count_tokens, truncate_tokens
+
+from app.logger import logger
+
+# What an older tool result or agent turn is cut down to once the history is over budget
+OLDER_TURN_TOKENS = 40
+
+
+def _content(message) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+def compact_text(text: str, max_tokens: int) -> str:
+    """
+        `text` cut to `max_tokens` tokens, with the tokens saved recorded in the run metrics.
+    """
+    compacted = truncate_tokens(text, max_tokens)
+    if compacted is not text:
+        metrics.record_tokens_saved(max(count_tokens(text) - count_tokens(compacted), 0))
+    return compacted
+
+def render_report(report, max_tokens: Optional[int] = None) -> str:
+    """
+        A report as prompt text: the split (or verdict) on one line, then the
+        justification, cut to REPORT_MAX_TOKENS. Used instead of the report's repr.
+    """
+    if report is None:
+        return "None."
+    max_tokens = max_tokens or get_settings().report_max_tokens
+    if hasattr(report, "verdict"):
+        return f"Verdict: {report.verdict.value}. Reason: {compact_text(report.reason, max_tokens)}"
+    return (
+        f"Equities {report.equities:.2f}, bonds {report.bonds:.2f}.\n"
+        f"Justification: {compact_text(report.justification, max_tokens)}"
+    )
+
+def compact_messages(messages: list, max_tokens: int, tool_output_tokens: int) -> tuple:
+    """
+        An agent's message history fitted to its token budget.
+
+        Every tool result is first cut to `tool_output_tokens`. If the history is still
+        over `max_tokens`, older turns are cut to OLDER_TURN_TOKENS each, oldest first,
+        until it fits. The task (the first message) and the latest exchange are kept
+        whole. Tool calls are never dropped, so every result still answers its call.
+
+        Returns:
+            tuple: (the compacted messages, the tokens saved).
+    """
+    before = count_message_tokens(messages)
+    compacted = []
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            content = _content(message)
+            shorter = truncate_tokens(content, tool_output_tokens)
+            if shorter is not content:
+                message = message.model_copy(update={"content": shorter})
+        compacted.append(message)
+
+    total = count_message_tokens(compacted)
+    if total > max_tokens:
+        # the latest exchange starts at the last tool-calling turn
+        latest = next(
+            (i for i in range(len(compacted) - 1, 0, -1) if isinstance(compacted[i], AIMessage) and compacted[i].tool_calls),
+            len(compacted),
+        )
+        for i in range(1, latest):
+            if total <= max_tokens:
+                break
+            message = compacted[i]
+            if not isinstance(message, (ToolMessage, AIMessage)):
+                continue
+            content = _content(message)
+            shorter = truncate_tokens(content, OLDER_TURN_TOKENS)
+            if shorter is not content:
+                compacted[i] = message.model_copy(update={"content": shorter})
+                total -= count_tokens(content) - count_tokens(shorter)
+
+    return compacted, max(before - count_message_tokens(compacted), 0)
+
+def compaction_hook(agent: str, max_tokens: int):
+    """
+        A pre_model_hook for create_react_agent that keeps `agent`'s history within
+        `max_tokens` (see compact_messages). The compacted history replaces the agent's
+        messages, so later turns and the final structured report are built on it too.
+    """
+    def hook(state) -> dict:
+        messages = state["messages"]
+        compacted, saved = compact_messages(messages, max_tokens, get_settings().tool_output_max_tokens)
+        # llm_input_messages persists between turns, so it is always set to this turn's
+        if not saved:
+            return {"llm_input_messages": messages}
+        metrics.record_tokens_saved(saved)
+        logger.info(f"🗜️ COMPACTION | {agent} | {saved} tokens saved")
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted], "llm_input_messages": compacted}
+
+    return hook
+
+def agent_hook(agent: str):
+    """
+        The compaction hook for `agent` with its budget from settings
+        (<AGENT>_MAX_PROMPT_TOKENS), or None when COMPACTION is off.
+    """
+    settings = get_settings()
+    if not settings.compaction:
+        return None
+    return compaction_hook(agent, getattr(settings, f"{agent}_max_prompt_tokens"))
@@ -1,4 +1,8 @@
+import os
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
+
 class Settings(BaseSettings):
     """Environment-backed settings for StratifyAI."""
     # Required API keys
@@ -8,6 +12,83 @@ class Settings(BaseSettings):
     # Optional flags
     debug: bool = False
 
+    # Logging: console output "rich", "plain" or "off", and the JSONL event log
+    log_console: str = "rich"
+    log_events: bool = True
+
+    # Local on-disk caches (price store, ...)
+    cache_dir: str = ".cache"
+
+    # Price store: never touch the network when offline, and treat any cached
+    # range reaching into the current month as stale after this many minutes
+    prices_offline: bool = False
+    prices_stale_after_minutes: int = 60
+
+    # Per-node graph checkpoints, so an interrupted simulation can be resumed
+    checkpoints: bool = True
+
+    # Human approval of Warn/Block verdicts: "queue" pauses the month for a later
+    # decision and carries on, "console" asks at the terminal (blocking)
+    approval_mode: str = "queue"
+    # Unattended policy: approve a Warn whose equity shift is below this (0 = never),
+    # and reject every Block
+    auto_approve_warn_max_shift: float = 0.0
+    auto_reject_block: bool = False
+
+    # CIO cross-examination budget per month: questions to the Quant/Analyst,
+    # tokens spent answering them, and seconds before questions stop
+    cio_max_questions: int = 4
+    cio_max_debate_tokens: int = 8_000
+    cio_debate_seconds: float = 120
+
+    # Risk pre-screen: clear cases get a verdict without the Risk LLM. A move in
+    # equities up to the pass shift is a Pass, one of at least the block shift is a
+    # Block, and so is a split whose weights miss 1 by more than the tolerance
+    risk_prescreen: bool = True
+    risk_pass_max_shift: float = 0.05
+    risk_block_min_shift: float = 0.3
+    risk_sum_tolerance: float = 0.01
+
+    # Prompt compaction: reports are rendered compactly, tool results cut to
+    # tool_output_max_tokens, and each agent's history kept within its budget
+    compaction: bool = True
+    tool_output_max_tokens: int = 500
+    report_max_tokens: int = 300
+    debate_evidence_max_tokens: int = 1_500
+    analyst_max_prompt_tokens: int = 6_000
+    quant_max_prompt_tokens: int = 3_000
+    cio_max_prompt_tokens: int = 6_000
+    risk_max_prompt_tokens: int = 4_000
+
+    # Quant node: "llm" asks the model, "rules" allocates from the indicators alone
+    # (no LLM call, for fast backtests)
+    quant_mode: str = "llm"
+
+    # LLM response cache: replay mode fails on a miss instead of calling OpenAI
+    llm_cache: bool = True
+    llm_cache_max_mb: int = 256
+    llm_replay: bool = False
+
+    # Process-wide provider limits, shared by every agent and tool
+    openai_requests_per_minute: int = 500
+    openai_tokens_per_minute: int = 200_000
+    openai_max_in_flight: int = 8
+    serper_requests_per_minute: int = 300
+    serper_max_in_flight: int = 8
+
+    # Parameter sweeps: at most this many worker processes (each a full app instance)
+    sweep_max_workers: int = 32
+
+    # Streamlit engine: runs executed at once in the background, and finished runs kept
+    engine_workers: int = 2
+    engine_cached_runs: int = 32
+
+    # Search tool: point serper_url at a local stand-in for offline tests
+    serper_url: str = "https://google.serper.dev/search"
+    search_top_k: int = 3
+    search_timeout_seconds: float = 10
+    search_cache_ttl_hours: float = 24
+
     # Instruct Pydantic to load a local .env file for development
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -15,14 +96,72 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
-# Instantiate settings (will read from environment or .env)
-settings = Settings()
+# Nothing below runs at import time: settings are read (and the API keys validated),
+# and the LLM is built, on first use. Importing a module never needs credentials.
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+        Instantiate settings on first use (will read from environment or .env).
+    """
+    return Settings()
+
+def register_limiters():
+    """
+        Registers the process-wide provider limiters from settings.
+    """
+    from app import rate_limiter
+    from app.rate_limiter import ProviderLimiter
+
+    settings = get_settings()
+    rate_limiter.register(ProviderLimiter(
+        "openai",
+        requests_per_minute=settings.openai_requests_per_minute,
+        tokens_per_minute=settings.openai_tokens_per_minute,
+        max_in_flight=settings.openai_max_in_flight,
+    ))
+    rate_limiter.register(ProviderLimiter(
+        "serper",
+        requests_per_minute=settings.serper_requests_per_minute,
+        max_in_flight=settings.serper_max_in_flight,
+    ))
+
+@lru_cache(maxsize=1)
+def get_llm_cache():
+    """
+        The on-disk LLM response cache, or None when disabled.
+        temperature=0 makes identical prompts reusable, so responses are cached on disk.
+    """
+    settings = get_settings()
+    if not (settings.llm_cache or settings.llm_replay):
+        return None
+
+    from app.llm_cache import SQLiteLLMCache
+
+    return SQLiteLLMCache(
+        path=os.path.join(settings.cache_dir, "llm.sqlite"),
+        max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+        replay=settings.llm_replay,
+    )
+
+@lru_cache(maxsize=1)
+def get_llm():
+    """
+        Initialize the OpenAI LLM using the loaded API key, on first use.
+    """
+    from app.rate_limiter import GovernedChatOpenAI
+
+    return GovernedChatOpenAI(
+        temperature=0,
+        model="gpt-3.5-turbo",
+        openai_api_key=get_settings().openai_api_key,
+        cache=get_llm_cache(),
+    )
 
-# Initialize the OpenAI LLM using the loaded API key
-from langchain_openai import ChatOpenAI
+# `settings`, `LLM` and `llm_cache` used to be built at import time; keep them reachable lazily
+_LAZY_ATTRIBUTES = {"settings": get_settings, "LLM": get_llm, "llm_cache": get_llm_cache}
 
-LLM = ChatOpenAI(
-    temperature=0,
-    model="gpt-3.5-turbo",
-    openai_api_key=settings.openai_api_key,
-)
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
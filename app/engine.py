@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from app import approvals, checkpoints
+from app.config import get_settings
+
+from app.logger import logger
+
+
+def params_key(months_to_run: int, initial_state: Optional[dict] = None) -> str:
+    """
+        The cache key of a run's parameters.
+    """
+    return json.dumps({"months_to_run": months_to_run, "initial_state": initial_state or {}}, sort_keys=True)
+
+
+class Job:
+    """
+        One run executing (or executed) in the background. Its events are appended by
+        the worker as the run progresses (see run_simulation's `on_event`), and read by
+        any number of pages polling it.
+    """
+
+    def __init__(self, key: str, months_to_run: int, initial_state: Optional[dict], run_id: str):
+        self.key = key
+        self.months_to_run = months_to_run
+        self.initial_state = initial_state
+        self.run_id = run_id
+        # set when one of the run's months is decided while it is still running
+        self.stale = False
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._events = []
+        self._lock = threading.Lock()
+
+    def add_event(self, event: dict):
+        with self._lock:
+            self._events.append({**event, "at": time.time()})
+
+    def events(self, since: int = 0) -> list:
+        """
+            The events from index `since` on, so a poller only renders what is new.
+        """
+        with self._lock:
+            return self._events[since:]
+
+    @property
+    def months_done(self) -> int:
+        with self._lock:
+            return sum(event["type"] == "month" for event in self._events)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+class SimulationEngine:
+    """
+        Runs simulations on a bounded pool of background threads, for the Streamlit app.
+        Jobs are keyed by their parameters: submitting parameters already running joins
+        that run, and parameters already run return the finished job (the last
+        ENGINE_CACHED_RUNS are kept). A failed run is retried on the next submit.
+
+        Deciding one of a run's months (approvals.decide) replays the months after it,
+        so the job is refreshed: a new job under the same key resumes the same run id,
+        reading the months before the decision back from their checkpoints.
+    """
+
+    def __init__(self, max_workers: int, cached_runs: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="engine")
+        self._cached_runs = cached_runs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        approvals.on_decision(self._on_decision)
+
+    def submit(self, months_to_run: int, initial_state: Optional[dict] = None) -> Job:
+        key = params_key(months_to_run, initial_state)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed":
+                self._jobs.move_to_end(key)
+                logger.info(f"🚂 ENGINE | {'cached' if job.done else 'joined'} run for {key}")
+                return job
+            job = self._jobs[key] = Job(key, months_to_run, initial_state, checkpoints.new_run_id())
+            self._evict()
+        logger.info(f"🚂 ENGINE | queued run for {key}")
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, key: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _refresh(self, job: Job) -> Job:
+        # replaces a finished job with a resume of its run; called with the lock held
+        job = self._jobs[job.key] = Job(job.key, job.months_to_run, job.initial_state, job.run_id)
+        logger.info(f"🚂 ENGINE | refreshing run {job.run_id} for {job.key}")
+        return job
+
+    def _on_decision(self, thread_id: str):
+        run_id = thread_id.split("/", 1)[0]
+        refreshed = []
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if job.run_id != run_id:
+                    continue
+                if job.done:
+                    refreshed.append(self._refresh(job))
+                else:
+                    job.stale = True
+        for job in refreshed:
+            self._executor.submit(self._run, job)
+
+    def _evict(self):
+        # only finished runs are dropped, oldest first
+        finished = [key for key, job in self._jobs.items() if job.done]
+        for key in finished[:max(len(self._jobs) - self._cached_runs, 0)]:
+            del self._jobs[key]
+
+    def _run(self, job: Job):
+        from app.main import run_simulation
+
+        job.status = "running"
+        try:
+            job.result = run_simulation(
+                job.months_to_run, run_id=job.run_id, initial_state=job.initial_state, on_event=job.add_event,
+            )
+            job.status = "completed"
+        except Exception as e:
+            job.error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            job.status = "failed"
+            logger.error(f"🚂 ENGINE | run for {job.key} failed\n{traceback.format_exc()}")
+        finally:
+            job.finished_at = time.time()
+        with self._lock:
+            refreshed = self._refresh(job) if job.stale and self._jobs.get(job.key) is job else None
+            self._evict()
+        if refreshed is not None:
+            self._executor.submit(self._run, refreshed)
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> SimulationEngine:
+    settings = get_settings()
+    return SimulationEngine(settings.engine_workers, settings.engine_cached_runs)
+
+
+if __name__ == "__main__":
+    job = get_engine().submit(1)
+    seen, finished = 0, False
+    while not finished:
+        finished = job.done
+        events = job.events(seen)
+        for event in events:
+            print(event["type"], event.get("node") or event.get("capital"))
+        seen += len(events)
+        time.sleep(0.5)
+    print(job.status, job.error or job.result["allocations"])
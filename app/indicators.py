@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from app import loader
+
+from app.logger import logger
+
+# Taylor (1993): neutral real rate and inflation target, in percent, with equal
+# weights on the inflation gap and the output gap
+NEUTRAL_REAL_RATE = 2.0
+INFLATION_TARGET = 2.0
+TAYLOR_INFLATION_WEIGHT = 0.5
+TAYLOR_OUTPUT_WEIGHT = 0.5
+# The output gap is read from unemployment through Okun's law
+NATURAL_UNEMPLOYMENT = 4.5
+OKUN_COEFFICIENT = 2.0
+
+TRADING_DAYS = 252
+MOMENTUM_SYMBOL = "SPY"
+# Price history needed before a run's first month: three month-ends back, for its
+# 3-month momentum, plus a margin
+LOOKBACK_DAYS = 100
+
+INDICATOR_FIELDS = [
+    "cpi_yoy", "unemployment_rate", "misery_index", "fed_rate", "real_rate",
+    "output_gap", "taylor_rate", "taylor_gap", "momentum_1m", "momentum_3m", "volatility",
+]
+
+# The table for the current run, built by precompute (see main.preload_prices)
+_indicator_table = None
+
+
+def macro_indicators(months: list) -> pd.DataFrame:
+    """
+    The macro indicators of every month, in one vectorised pass over the whole run.
+
+    The Fed rate is the midpoint of the parsed target range, carried forward over
+    months whose statement has none. The real rate is the Fed rate less CPI inflation;
+    the Taylor-rule rate is r* + inflation + 0.5 (inflation - target) + 0.5 output gap,
+    with the output gap from Okun's law; the Taylor gap is the Fed rate less it (above
+    zero, policy is tighter than the rule).
+
+    Returns:
+        pd.DataFrame: One row per month, indexed by its Period, with the macro fields.
+    """
+    derived = [month.get("derived") or loader.derive_fields(month) for month in months]
+    cpi = np.array([month["economic_indicators"]["cpi_yoy"] for month in months], dtype=float)
+    unemployment = np.array([month["economic_indicators"]["unemployment_rate"] for month in months], dtype=float)
+    fed_rate = pd.Series([d["fed_rate"] for d in derived], dtype=float).ffill().to_numpy()
+
+    output_gap = OKUN_COEFFICIENT * (NATURAL_UNEMPLOYMENT - unemployment)
+    taylor_rate = (
+        NEUTRAL_REAL_RATE + cpi
+        + TAYLOR_INFLATION_WEIGHT * (cpi - INFLATION_TARGET)
+        + TAYLOR_OUTPUT_WEIGHT * output_gap
+    )
+    index = pd.PeriodIndex([pd.Period(year=d["year"], month=d["month"], freq="M") for d in derived], name="month")
+    return pd.DataFrame({
+        "cpi_yoy": cpi,
+        "unemployment_rate": unemployment,
+        "misery_index": cpi + unemployment,
+        "fed_rate": fed_rate,
+        "real_rate": fed_rate - cpi,
+        "output_gap": output_gap,
+        "taylor_rate": taylor_rate,
+        "taylor_gap": fed_rate - taylor_rate,
+    }, index=index)
+
+def price_indicators(panel: pd.DataFrame, symbol: str = MOMENTUM_SYMBOL, column: str = "Close") -> pd.DataFrame:
+    """
+    Momentum and volatility of `symbol` for every month of a price panel (as from
+    PriceStore.load_panel): the 1 and 3 month returns to the month-end close, and
+    the annualised standard deviation of the month's daily returns.
+
+    Returns:
+        pd.DataFrame: One row per month period, with momentum_1m, momentum_3m and volatility.
+    """
+    if panel is None or symbol not in panel.index.get_level_values("symbol"):
+        return pd.DataFrame(columns=["momentum_1m", "momentum_3m", "volatility"], index=pd.PeriodIndex([], freq="M", name="month"))
+
+    closes = panel.xs(symbol, level="symbol")[column].sort_index()
+    months = closes.index.to_period("M")
+    daily = closes.pct_change()
+    month_end = closes.groupby(months).last()
+    return pd.DataFrame({
+        "momentum_1m": month_end.pct_change(1),
+        "momentum_3m": month_end.pct_change(3),
+        "volatility": daily.groupby(months).std() * np.sqrt(TRADING_DAYS),
+    }).rename_axis("month")
+
+def compute(months: list, panel: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Every indicator for every month: the macro ones, joined with the price ones when a
+    price panel is given (NaN where the panel has no history, e.g. the first months).
+    """
+    table = macro_indicators(months)
+    table = table.join(price_indicators(panel), how="left")
+    return table.reindex(columns=INDICATOR_FIELDS).round(4)
+
+def precompute(months: list, panel: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Computes the whole run's indicators up front, so monthly lookups are a table read.
+    Months already computed are kept, for runs in the same process over other months.
+    """
+    global _indicator_table
+    table = compute(months, panel)
+    _indicator_table = table if _indicator_table is None else table.combine_first(_indicator_table)[INDICATOR_FIELDS]
+    logger.info(f"📐 INDICATORS | precomputed {len(table)} months")
+    return _indicator_table
+
+def month_indicators(month: dict) -> dict:
+    """
+    The indicators of one month: read from the precomputed table when the run has one,
+    otherwise computed on the spot (without the price indicators).
+    """
+    year, month_number = loader.year_month(month)
+    key = pd.Period(year=year, month=month_number, freq="M")
+    # read once: a run starting in another thread may replace the table meanwhile
+    table = _indicator_table
+    if table is not None and key in table.index:
+        row = table.loc[key]
+    else:
+        row = compute([month]).iloc[0]
+    return {field: (None if pd.isna(value) else float(value)) for field, value in row.items()}
+
+def format_indicators_for_llm(indicators: dict, indent: str = "") -> str:
+    """
+    The indicators as prompt lines (each starting with `indent`); indicators without
+    a value are left out.
+    """
+    labels = {
+        "misery_index": ("Misery index (CPI + unemployment)", "{:.2f}"),
+        "fed_rate": ("Fed funds rate (target range midpoint)", "{:.3f}%"),
+        "real_rate": ("Real rate (Fed rate - CPI)", "{:.2f}%"),
+        "output_gap": ("Output gap (Okun's law)", "{:.2f}%"),
+        "taylor_rate": ("Taylor-rule rate", "{:.2f}%"),
+        "taylor_gap": ("Taylor gap (Fed rate - Taylor rate, > 0 is tight)", "{:.2f}pp"),
+        "momentum_1m": (f"{MOMENTUM_SYMBOL} 1-month momentum", "{:.2%}"),
+        "momentum_3m": (f"{MOMENTUM_SYMBOL} 3-month momentum", "{:.2%}"),
+        "volatility": (f"{MOMENTUM_SYMBOL} annualised volatility", "{:.2%}"),
+    }
+    return "\n".join(
+        f"{indent}- {label}: {template.format(indicators[field])}"
+        for field, (label, template) in labels.items()
+        if indicators.get(field) is not None
+    )
+
+
+if __name__ == "__main__":
+    store = loader.get_market_data_store()
+    print(compute(list(store)))
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from app import metrics
+from app.utils import open_sqlite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access);
+"""
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+def conversation(prompt: str) -> str:
+    """
+        The serialised messages of a prompt with only their role, content, tool calls
+        and tool call id kept. add_messages gives every message a random `id`, so the
+        raw prompt of an agent turn differs on every run. Prompts that are not
+        serialised messages are returned as they are.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+
+    def essentials(message):
+        if not (isinstance(message, dict) and message.get("type") == "constructor"):
+            return message
+        kwargs = message.get("kwargs", {})
+        return {
+            "role": message["id"][-1],
+            "content": kwargs.get("content"),
+            "tool_calls": kwargs.get("tool_calls"),
+            "tool_call_id": kwargs.get("tool_call_id"),
+        }
+
+    return json.dumps([essentials(message) for message in messages], sort_keys=True)
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+        Persistent, content-addressed cache of LLM responses.
+
+        LangChain hands the cache the serialised messages (`prompt`) and the model's
+        invocation parameters (`llm_string`: model, temperature, bound tools,
+        response format...). The key hashes both, with each message reduced to what
+        the model sees (see conversation): any change to that is a miss, but the random
+        ids LangGraph gives every message are not.
+        The cache is capped at `max_bytes`; the least recently used responses are
+        evicted first.
+
+        In replay mode a miss raises LLMCacheMiss instead of falling through to the
+        provider, so a replayed run never touches the network.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, replay: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{conversation(prompt)}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self.key(prompt, llm_string)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            self.misses += 1
+            metrics.record_cache("llm", hit=False)
+            if self.replay:
+                raise LLMCacheMiss(f"No recorded LLM response for key {key} (replay mode)")
+            return None
+        self.hits += 1
+        metrics.record_cache("llm", hit=True)
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        value = json.dumps([dumps(generation) for generation in return_val])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (self.key(prompt, llm_string), value, len(value), time.time()),
+            )
+            self._evict()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def _evict(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
@@ -1,17 +1,190 @@
 import json
+import mmap
+import os
+import threading
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from app.utils import convert_date
+
+from app.logger import logger
 
 FILEPATH = "app/data/market_data.json"
+# The compiled store: one JSON month per line, plus an index of where each line starts
+STORE_PATH = "app/data/market_data.jsonl"
+# Bump when the compiled record layout changes, so old stores are rebuilt
+STORE_VERSION = 1
+
+
+def _index_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".index.json"
+
+def derive_fields(month: dict) -> dict:
+    """
+        The fields every consumer used to recompute from a raw month: its year and
+        month number, the parsed Fed target range and move, and the misery index.
+    """
+    # only the compile step needs the Fed statement patterns
+    from app.tools.interest_extractor import classify, extract
+
+    year, month_number = convert_date(month["month"])
+    indicators = month.get("economic_indicators", {})
+    statement = indicators.get("fed_interest_rate_decision", "")
+    extracted = extract(statement)
+    analysis = classify(statement)
+    return {
+        "year": year,
+        "month": month_number,
+        "fed_range": list(extracted["new_range"]) if extracted["new_range"] else None,
+        "fed_rate": extracted["nominal_rate"],
+        "fed_change_bp": analysis.basis_points_change if analysis else None,
+        "misery_index": round(indicators["cpi_yoy"] + indicators["unemployment_rate"], 3)
+            if "cpi_yoy" in indicators and "unemployment_rate" in indicators else None,
+    }
+
+def year_month(month: dict) -> tuple:
+    """
+        (year, month number) of a month, from its derived fields when it has them.
+    """
+    derived = month.get("derived")
+    if derived:
+        return derived["year"], derived["month"]
+    return convert_date(month["month"])
+
+def compile_store(source: str = FILEPATH, path: str = STORE_PATH) -> dict:
+    """
+        One-time compile of the market data JSON into the JSONL store.
+        Each line is a month with its derived fields under "derived"; the index maps
+        every month label to the byte offset and length of its line.
+    """
+    with open(source, "r") as f:
+        months = json.load(f)["market_data"]
+
+    entries = []
+    offset = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        for month in months:
+            line = json.dumps({**month, "derived": derive_fields(month)}, separators=(",", ":")).encode("utf-8") + b"\n"
+            f.write(line)
+            entries.append([month["month"], offset, len(line)])
+            offset += len(line)
+
+    index = {"version": STORE_VERSION, "source_mtime": os.path.getmtime(source), "months": entries}
+    tmp_index = f"{_index_path(path)}.{os.getpid()}.tmp"
+    with open(tmp_index, "w") as f:
+        json.dump(index, f)
+    # data first, index last: a reader never sees an index pointing into another file
+    os.replace(tmp_path, path)
+    os.replace(tmp_index, _index_path(path))
+    logger.info(f"🗂️ MARKET DATA | compiled {len(entries)} months into {path}")
+    return index
+
+
+class MarketDataStore:
+    """
+        Read-only, indexed view of the compiled market data.
+
+        Only the index (labels and byte offsets) is held in memory. A month is parsed
+        from the memory-mapped file when it is asked for, so a store with years of
+        news costs next to nothing until it is read. The store is compiled from the
+        source JSON on first use, and recompiled whenever the source changes.
+    """
+
+    def __init__(self, path: str = STORE_PATH, source: Optional[str] = FILEPATH):
+        self.path = path
+        self.source = source
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._file = None
+
+        index = self._read_index()
+        if index is None:
+            index = compile_store(source, path)
+        self._entries = index["months"]
+        self._positions = {label: position for position, (label, _, _) in enumerate(self._entries)}
+
+    def _read_index(self) -> Optional[dict]:
+        try:
+            with open(_index_path(self.path), "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != STORE_VERSION:
+            return None
+        if self.source is not None and os.path.exists(self.source) and os.path.getmtime(self.source) != index["source_mtime"]:
+            return None
+        return index
+
+    def _map(self) -> mmap.mmap:
+        with self._lock:
+            if self._mmap is None:
+                self._file = open(self.path, "rb")
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def labels(self) -> list:
+        return [label for label, _, _ in self._entries]
+
+    def position(self, label: str) -> int:
+        """
+            Index of the month labelled `label` (e.g. "January 2023").
+        """
+        return self._positions[label]
+
+    def month(self, key) -> dict:
+        """
+            A single month, by position or by label.
+        """
+        position = self._positions[key] if isinstance(key, str) else key
+        _, offset, length = self._entries[position]
+        return json.loads(self._map()[offset:offset + length])
+
+    __getitem__ = month
+
+    def iter_months(self, start: int = 0, stop: Optional[int] = None) -> Iterator[dict]:
+        """
+            Yields the months in [start, stop), parsing each only when it is reached.
+        """
+        for position in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.month(position)
+
+    __iter__ = iter_months
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._file.close()
+                self._mmap = self._file = None
+
+
+@lru_cache(maxsize=1)
+def get_market_data_store() -> MarketDataStore:
+    """
+        The process-wide market data store.
+    """
+    return MarketDataStore()
 
 def load_data(filepath=FILEPATH):
+    """
+        The whole document, as {"market_data": [month, ...]}.
+        Prefer get_market_data_store(), which does not hold every month in memory.
+    """
+    if filepath == FILEPATH:
+        return {"market_data": list(get_market_data_store().iter_months())}
     with open(filepath, 'r') as f:
         data = json.load(f)
     return data
 
 def load_month(month=1):
-    data = load_data()
-    return data['market_data'][month]
+    return get_market_data_store().month(month)
 
 # Example usage:
 if __name__ == "__main__":
-    json_data = load_data()
-    print(json_data)
+    store = get_market_data_store()
+    print(f"{len(store)} months: {', '.join(store.labels())}")
+    print(store.month(0)["derived"])
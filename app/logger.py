@@ -1,19 +1,120 @@
+import atexit
+import json
 import logging
-from rich.logging import RichHandler
-
+import os
+import queue
 from datetime import datetime
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 
 
 now = datetime.now()
 filename = now.strftime("%a%d%B_%H%M_%S")
 
+EVENTS_LOGGER = "app_events"
+# Longest string kept in an event; reports and news are cut, not dumped
+EVENT_MAX_CHARS = 500
+
+
+@lru_cache(maxsize=1)
+def _options() -> dict:
+    """
+        The logging settings, read on first use. Logging can start before the settings
+        are loadable (e.g. no API keys yet), so fall back to the environment then.
+    """
+    try:
+        from app.config import get_settings
+
+        settings = get_settings()
+        return {"debug": settings.debug, "console": settings.log_console, "events": settings.log_events}
+    except Exception:
+        return {
+            "debug": os.environ.get("DEBUG", "").lower() in ("1", "true"),
+            "console": os.environ.get("LOG_CONSOLE", "rich").lower(),
+            "events": os.environ.get("LOG_EVENTS", "true").lower() not in ("0", "false"),
+        }
+
+
+class LazyConsoleHandler(logging.Handler):
+    """
+        Console handler chosen on the first record, from LOG_CONSOLE: "rich" imports
+        rich (slow to import, and optional) only then, "plain" writes plain lines to
+        stderr and "off" drops console output, leaving the log file.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__()
+        self._kwargs = kwargs
+        self._handler = None
+
+    def _build(self) -> logging.Handler:
+        mode = _options()["console"]
+        if mode == "off":
+            return logging.NullHandler()
+        if mode == "rich":
+            try:
+                from rich.logging import RichHandler
+
+                handler = RichHandler(**self._kwargs)
+                handler.setFormatter(self.formatter)
+                return handler
+            except ImportError:
+                pass
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s | %(levelname)s | %(message)s'))
+        return handler
+
+    def emit(self, record):
+        if self._handler is None:
+            self._handler = self._build()
+        self._handler.emit(record)
+
+
+# kept for code that still refers to the old name
+LazyRichHandler = LazyConsoleHandler
+
+
+class _DebugGate(logging.Filter):
+    """
+        Drops DEBUG records before they are queued (and their arguments rendered),
+        unless DEBUG is set.
+    """
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _options()["debug"]
 
-# Configure RichHandler
+
+class _NotEvents(logging.Filter):
+    def filter(self, record):
+        return record.name != EVENTS_LOGGER
+
+
+class JsonlEventFormatter(logging.Formatter):
+    """
+        Renders an event on the listener thread: callable fields (the state diffs)
+        are only called here, off the caller's hot path.
+    """
+
+    def format(self, record):
+        fields = {key: value() if callable(value) else value for key, value in record.event.items()}
+        return json.dumps({"ts": round(record.created, 6), "event": record.getMessage(), **fields}, default=str)
+
+
+# Records are put on a queue by the caller and written by one listener thread, so
+# console rendering and file I/O stay off the simulation's hot path.
+_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(_queue)
+queue_handler.addFilter(_DebugGate())
+
+console_handler = LazyConsoleHandler(rich_tracebacks=True, markup=True)
+console_handler.addFilter(_NotEvents())
+
+# Configure the console through the queue
 logging.basicConfig(
     level=logging.INFO,
     format="%(message)s",
     datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True, markup=True)]
+    handlers=[queue_handler]
 )
 
 # Create your logger instance
@@ -23,12 +124,65 @@ logger = logging.getLogger("app_logger")
 logger.setLevel(logging.DEBUG)
 
 # Create a FileHandler for file output, excluding DEBUG messages
-file_handler = logging.FileHandler(f"logs/{filename}_run.log")
+# (delay=True: the timestamped file is only created when the first line is written)
+file_handler = logging.FileHandler(f"logs/{filename}_run.log", delay=True)
 file_handler.setLevel(logging.INFO)  # Exclude DEBUG messages
 
 # Create a formatter and set it for the FileHandler
 formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s')
 file_handler.setFormatter(formatter)
+# only the app's own records go to the file, as before
+file_handler.addFilter(logging.Filter("app_logger"))
+
+# Compact JSONL events (one per graph node and month), see log_event
+events_handler = logging.FileHandler(f"logs/{filename}_events.jsonl", delay=True)
+events_handler.setFormatter(JsonlEventFormatter())
+events_handler.addFilter(logging.Filter(EVENTS_LOGGER))
+
+events = logging.getLogger(EVENTS_LOGGER)
+events.setLevel(logging.INFO)
+
+listener = QueueListener(_queue, console_handler, file_handler, events_handler, respect_handler_level=True)
+listener.start()
+# flush whatever is still queued when the process exits
+atexit.register(listener.stop)
+
+# ============ EVENTS ===============
+
+def render(value):
+    """
+        A compact, JSON-able copy of a state value: reports as their fields, the
+        market data as its month label, long text cut to EVENT_MAX_CHARS.
+    """
+    if hasattr(value, "model_dump"):
+        return render(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        if "economic_indicators" in value and "month" in value:
+            return value["month"]
+        return {key: render(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [render(item) for item in value]
+    if isinstance(value, str) and len(value) > EVENT_MAX_CHARS:
+        return value[:EVENT_MAX_CHARS] + "…"
+    return value
+
+def state_diff(before: dict, after: dict) -> dict:
+    """
+        The keys of `after` that differ from `before`, rendered.
+    """
+    return {
+        key: render(value) for key, value in after.items()
+        if key not in before or (before[key] is not value and before[key] != value)
+    }
+
+def log_event(event: str, **fields):
+    """
+        Writes one JSONL event (run id, month, node, duration, state diff...).
+        Pass callables for expensive fields: they are called on the listener thread
+        when the event is written (never when events are off), so they must only
+        read values the caller will not change afterwards.
+    """
+    if not _options()["events"]:
+        return
+    events.info(event, extra={"event": fields})
 
-# Add the FileHandler to the logger
-logger.addHandler(file_handler)
\ No newline at end of file
@@ -1,114 +1,611 @@
 # app/main.py
 
+from __future__ import annotations
+
+from datetime import timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from app import loader
-from langgraph.graph import StateGraph, START, END
-from app.types import SharedState
+from app.utils import convert_date, month_bounds
 
-from app.agents.analyst_agent import analyst_agent_node
-from app.agents.quant_agent import quant_agent_node
-from app.agents.CIO_agent import CIO_agent_node
-from app.agents.risk_agent import risk_agent_node
-from app.nodes.human_node import human_node
-from app.nodes.execution_node import execution_node
+from app.logger import logger
 
-from app.edges.route_CIO_decision import route_CIO_decision
+if TYPE_CHECKING:
+    from app.types import SharedState
 
-from app.utils import convert_date
+# Nothing heavy happens at import time: the market data store is opened, and the
+# agents and graphs are built, the first time they are needed (see get_graph).
 
-from app.logger import logger
+def get_data() -> dict:
+    """
+    The entire dataset, as {"market_data": [...]}. Kept for callers that want
+    every month at once; the simulations stream months from the store instead.
+    """
+    return loader.load_data()
+
+def num_months() -> int:
+    return len(loader.get_market_data_store())
+
+def build_graph(research: bool = True, checkpointer=None):
+    """
+    Builds the multi-agent graph.
+    With research=False the Analyst and Quant are left out and the graph starts at
+    the CIO, for states whose research reports were produced separately.
+    With a checkpointer, the state is saved after every node (see app.checkpoints).
+    Every node is timed, and what it spends is attributed to it, in app.metrics.
+    """
+    from langgraph.graph import StateGraph, START, END
+    from langchain_core.runnables import RunnableLambda
+
+    from app import metrics
+    from app.types import SharedState
+    from app.agents.analyst_agent import analyst_agent_node, aanalyst_agent_node
+    from app.agents.quant_agent import quant_agent_node, aquant_agent_node
+    from app.agents.CIO_agent import CIO_agent_node, aCIO_agent_node
+    from app.agents.risk_agent import risk_agent_node, arisk_agent_node
+    from app.nodes.human_node import human_node, ahuman_node
+    from app.nodes.execution_node import execution_node
+    from app.edges.route_CIO_decision import route_CIO_decision
+
+    def node(name, func, afunc):
+        return RunnableLambda(*metrics.timed_node(name, func, afunc))
+
+    builder = StateGraph(SharedState)
+    # every node has a sync and an async implementation, for invoke and ainvoke
+    if research:
+        builder.add_node("AnalystAgent", node("AnalystAgent", analyst_agent_node, aanalyst_agent_node))
+        builder.add_node("QuantAgent", node("QuantAgent", quant_agent_node, aquant_agent_node))
+    builder.add_node("CIOAgent", node("CIOAgent", CIO_agent_node, aCIO_agent_node))
+    builder.add_node("RiskAgent", node("RiskAgent", risk_agent_node, arisk_agent_node))
+    builder.add_node("HumanNode", node("HumanNode", human_node, ahuman_node))
+    builder.add_node("ExecutionNode", metrics.timed_node("ExecutionNode", execution_node))
+    if research:
+        builder.add_edge(START, "AnalystAgent")
+        builder.add_edge(START, "QuantAgent")
+        builder.add_edge("AnalystAgent", "CIOAgent")
+        builder.add_edge("QuantAgent", "CIOAgent")
+    else:
+        builder.add_edge(START, "CIOAgent")
+    builder.add_edge("CIOAgent", "RiskAgent")
+    builder.add_conditional_edges("RiskAgent", route_CIO_decision)
+    builder.add_edge("HumanNode", "ExecutionNode")
+    builder.add_edge("ExecutionNode", END)
+    return builder.compile(checkpointer=checkpointer)
+
+@lru_cache(maxsize=4)
+def get_graph(research: bool = True, checkpointed: bool = False):
+    """
+    The compiled multi-agent graph, built once per process. research=False gives the
+    CIO -> Risk -> Execution chain used by the pipelined mode; checkpointed=True saves
+    its state to the SQLite checkpointer after every node.
+    """
+    from app import checkpoints
 
-# Load your entire dataset once
-data = loader.load_data()
-NUM_MONTHS = len(data["market_data"])
-
-# Build the multi-agent graph
-builder = StateGraph(SharedState)
-builder.add_node("AnalystAgent", analyst_agent_node)
-builder.add_node("QuantAgent", quant_agent_node)
-builder.add_node("CIOAgent", CIO_agent_node)
-builder.add_node("RiskAgent", risk_agent_node)
-builder.add_node("HumanNode", human_node)
-builder.add_node("ExecutionNode", execution_node)
-builder.add_edge(START, "AnalystAgent")
-builder.add_edge(START, "QuantAgent")
-builder.add_edge("AnalystAgent", "CIOAgent")
-builder.add_edge("QuantAgent", "CIOAgent")
-builder.add_edge("CIOAgent", "RiskAgent")
-builder.add_conditional_edges("RiskAgent", route_CIO_decision)
-builder.add_edge("HumanNode", "ExecutionNode")
-builder.add_edge("ExecutionNode", END)
-graph = builder.compile()
+    return build_graph(research=research, checkpointer=checkpoints.get_checkpointer() if checkpointed else None)
 
 # ========== INITIAL STATE SETUP ==========
-initial_year, initial_month = convert_date(data["market_data"][0]["month"])
-initial_state = SharedState(
-    capital=1000,
-    market_data=data["market_data"][0],
-    current_month=data["market_data"][0]["month"],
-    prev_equity_allocation=0.6,
-    prev_bond_allocation=0.4,
-    analyst_report=None,
-    quant_report=None,
-    CIO_report=None,
-    human_decision=None,
-    year=initial_year,
-    month=initial_month,
-)
-
-def run__monthly_workflow(state: SharedState) -> SharedState:
-    return graph.invoke(state)
-
-def run_simulation(months_to_run: int = None):
-    """
-    Run up to `months_to_run` months of your market_data (from the start).
+def get_initial_state(overrides: dict = None) -> SharedState:
+    """
+    A fresh state for the first month of the dataset, with `overrides` (e.g. another
+    starting capital or split) applied on top.
+    """
+    first_month = loader.load_month(0)
+    initial_year, initial_month = loader.year_month(first_month)
+    return dict(
+        capital=1000,
+        market_data=first_month,
+        current_month=first_month["month"],
+        prev_equity_allocation=0.6,
+        prev_bond_allocation=0.4,
+        analyst_report=None,
+        quant_report=None,
+        CIO_report=None,
+        human_decision=None,
+        year=initial_year,
+        month=initial_month,
+    ) | (overrides or {})
+
+def get_start_state(overrides: dict = None, start_month: int = 0) -> SharedState:
+    """
+    The initial state moved on to month `start_month`. No decision was taken before it,
+    so the initial split is the one in force.
+    """
+    state = get_initial_state(overrides)
+    if start_month:
+        state = advance_month(state, loader.load_month(start_month), state["prev_equity_allocation"], state["prev_bond_allocation"])
+    return state
+
+# `data`, `NUM_MONTHS`, `initial_state`, `graph` and `decision_graph` used to be
+# built at import time; they are still importable, but are only built when asked for
+_LAZY_ATTRIBUTES = {
+    "data": get_data,
+    "NUM_MONTHS": num_months,
+    "initial_state": get_initial_state,
+    "graph": get_graph,
+    "decision_graph": lambda: get_graph(research=False),
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def run__monthly_workflow(state: SharedState, config: dict = None, on_node=None) -> SharedState:
+    """
+    Runs one month. With a checkpoint `config` (see checkpoints.month_config) the month
+    is checkpointed after every node, and picks up where a previous attempt stopped.
+    With `on_node`, the graph is streamed and on_node(node, update) called as each node finishes.
+    """
+    from app import checkpoints
+
+    return checkpoints.run_month(get_graph(checkpointed=config is not None), state, config, on_node)
+
+async def arun__monthly_workflow(state: SharedState) -> SharedState:
+    return await get_graph().ainvoke(state)
+
+def preload_prices(first_month: dict, last_month: dict, symbols: list = None):
+    """
+    Loads every price the run needs, from `first_month` to `last_month`, in one batched
+    request, and precomputes the monthly summaries the Quant node reads.
+    By default, the Quant's tickers and the backtest's bond proxy.
+    The Quant's indicators (see app.indicators) are computed for every month in between.
+    """
+    from app import price_store, backtest, indicators
+    from app.agents.quant_agent import QUANT_SYMBOLS
+    from app.tools import yfinance_api
+
+    if symbols is None:
+        symbols = QUANT_SYMBOLS + [backtest.BOND_PROXY]
+    start, _ = month_bounds(*loader.year_month(first_month))
+    _, end = month_bounds(*loader.year_month(last_month))
+    # three months of lookback, for the first month's momentum (and previous close)
+    start -= timedelta(days=indicators.LOOKBACK_DAYS)
+    logger.info(f"💾 PRICE STORE | preloading {', '.join(symbols)} from {start} to {end}")
+    panel = price_store.load_panel(symbols, start, end)
+    yfinance_api.precompute_summaries(panel)
+
+    store = loader.get_market_data_store()
+    months = store.iter_months(store.position(first_month["month"]), store.position(last_month["month"]) + 1)
+    indicators.precompute(list(months), panel)
+    return panel
+
+def executed_allocation(state: SharedState) -> tuple:
+    """
+    The (equities, bonds) split the portfolio holds after this month's workflow:
+    the CIO's split if it was approved, otherwise the previous allocation
+    (including while the month is still waiting in the approval queue).
+    """
+    from app.types import HumanApproval
+
+    if state.get("human_approval") == HumanApproval.approve:
+        return state["CIO_report"].equities, state["CIO_report"].bonds
+    return state["prev_equity_allocation"], state["prev_bond_allocation"]
+
+def close_month(state: SharedState, allocations: list) -> tuple:
+    """
+    Books a finished month: compounds capital with the split held through the month,
+    records the executed split in `allocations` and returns it.
+    A month paused for human approval is booked as not rebalanced, so the run can carry on.
+    """
+    from app import backtest
+
+    awaiting_approval = bool(state.pop("__interrupt__", None))
+    if awaiting_approval:
+        logger.info(f"⏸️ HUMAN APPROVAL | {state['current_month']} awaits review, holding the previous split")
+
+    # the portfolio held last month's split through this month
+    state["capital"] = state["capital"] * backtest.holding_growth(
+        state["prev_equity_allocation"], state["prev_bond_allocation"], state["year"], state["month"]
+    )
+    equities, bonds = executed_allocation(state)
+    allocations.append({
+        "month": state["current_month"], "equities": equities, "bonds": bonds, "capital": state["capital"],
+        "awaiting_approval": awaiting_approval,
+    })
+    return equities, bonds
+
+def advance_month(state: SharedState, month_data: dict, equities: float, bonds: float) -> SharedState:
+    """
+    Prepares the state for the next month, carrying the executed split forward.
+    """
+    state["market_data"]         = month_data
+    state["current_month"]       = month_data["month"]
+    state["year"], state["month"] = loader.year_month(month_data)
+    state["prev_equity_allocation"] = equities
+    state["prev_bond_allocation"]   = bonds
+
+    # clear out last reports & flags
+    for key in ["analyst_report", "quant_report", "analyst_evidence", "quant_evidence", "risk_report", "CIO_report", "human_approval"]:
+        state[key] = None
+    return state
+
+def run_simulation(months_to_run: int = None, pipelined: bool = False, max_workers: int = 4, run_id: str = None,
+                   initial_state: dict = None, on_event=None, start_month: int = 0):
+    """
+    Run up to `months_to_run` months of your market_data, from month index `start_month`
+    (the start by default).
     If months_to_run is None or exceeds available data, will run all.
+    With pipelined=True, see run_pipelined_simulation (which is not checkpointed, and
+    does not call `on_event`).
+    `initial_state` overrides fields of the initial state, e.g. {"capital": 5000}.
+    `on_event`, if given, is called with a dict as the run progresses: a "node" event
+    as each graph node finishes (with its state update) and a "month" event as each
+    month is booked (with its executed allocation), e.g. to stream a run to a UI.
+
+    Capital is compounded each month with the allocation held through that month.
+    Every month is checkpointed under `run_id` (a new id if not given), so a crashed
+    run can be continued with resume(run_id).
+    The run's metrics are exported to CACHE_DIR/metrics/<run_id>.json and .prom, even
+    if it crashes (a resumed run overwrites them with the resumed attempt's).
+    Returns the final state, the executed allocation of every month, the run id and
+    the metrics.
     """
     # Decide how many months to process
-    if months_to_run is None or months_to_run > NUM_MONTHS:
-        months_to_run = NUM_MONTHS
-
-    # Start from a fresh copy of the initial state
-    state = initial_state
-
-    for month_idx in range(months_to_run):
-        month_label = data["market_data"][month_idx]["month"]
-        logger.info(f"====== {month_label} ======")
-        logger.info("💿 STATE BEFORE")
-        logger.info(state)
-        logger.info("⌛️ WORKFLOW | running monthly workflow")
-
-        # invoke the graph for this month
-        state = run__monthly_workflow(state)
-
-        logger.info("✅✅✅ WORKFLOW COMPLETE")
-        logger.info("💿 STATE AFTER")
-        logger.info(state)
-
-        # prepare for next month (if any)
-        if month_idx + 1 < months_to_run:
-            next_data = data["market_data"][month_idx + 1]
-            state["market_data"]         = next_data
-            state["current_month"]       = next_data["month"]
-            state["prev_equity_allocation"] = state["CIO_report"].equities
-            state["prev_bond_allocation"]   = state["CIO_report"].bonds
-
-            # clear out last reports & flags
-            for key in ["analyst_report", "quant_report", "risk_report", "CIO_report", "human_approval"]:
-                state[key] = None
-
-    logger.info("✅✅✅ SIMULATION | completed")
+    if months_to_run is None or months_to_run > num_months() - start_month:
+        months_to_run = num_months() - start_month
+
+    if pipelined:
+        return run_pipelined_simulation(months_to_run, max_workers, initial_state)
+
+    from app import checkpoints, metrics
+
+    store = loader.get_market_data_store()
+    run_id = checkpoints.start_run(months_to_run, run_id, initial_state, start_month)
+    metrics.begin(run_id or checkpoints.new_run_id())
+
+    try:
+        stop = start_month + months_to_run
+        preload_prices(store[start_month], store[stop - 1])
+
+        # Start from a fresh copy of the initial state
+        state = get_start_state(initial_state, start_month)
+        allocations = []
+
+        # months are read from the store one at a time, as the simulation reaches them
+        for month_idx, month_data in enumerate(store.iter_months(start_month, stop), start_month):
+            # prepare this month (the first one is the initial state's)
+            if month_idx > start_month:
+                state = advance_month(state, month_data, equities, bonds)
+
+            logger.info(f"====== {month_data['month']} ======")
+            # the full state is only rendered with DEBUG on; the event log has the diff
+            logger.debug("💿 STATE BEFORE | %s", state)
+            logger.info("⌛️ WORKFLOW | running monthly workflow")
+
+            # invoke the graph for this month, on its own checkpoint thread
+            config = checkpoints.month_config(run_id, month_idx) if run_id else None
+            on_node = None
+            if on_event:
+                def on_node(node, update, month=month_data["month"], month_idx=month_idx):
+                    on_event({"type": "node", "month": month, "month_idx": month_idx, "node": node, "update": update})
+            with metrics.month_scope(month_data["month"], state) as month:
+                state = month["state"] = run__monthly_workflow(state, config, on_node)
+            equities, bonds = close_month(state, allocations)
+            if on_event:
+                on_event({"type": "month", "month_idx": month_idx, "months_to_run": months_to_run, **allocations[-1]})
+
+            logger.info("✅✅✅ WORKFLOW COMPLETE")
+            logger.debug("💿 STATE AFTER | %s", state)
+
+        if run_id:
+            checkpoints.complete_run(run_id)
+        logger.info("✅✅✅ SIMULATION | completed")
+    finally:
+        run_metrics = metrics.finish()
     # return the final state or any summary as needed
-    return {"final_state": state}
+    return {"final_state": state, "allocations": allocations, "run_id": run_id, "metrics": run_metrics}
 
-def backtest_simulation(start_date, end_date):
+async def arun_simulation(months_to_run: int = None, run_id: str = None, initial_state: dict = None, start_month: int = 0):
     """
-    Stub for historical backtest. Replace with real logic or loop over run_simulation.
+    Async twin of run_simulation. Nodes and tools run on the event loop, so the
+    Analyst and Quant branches, and the tool calls inside each agent loop, overlap
+    their network waits instead of blocking threads.
+    Checkpoints go to the same database, so either twin can resume the other's runs.
     """
-    equity_curve = []
-    metrics = {}
-    return {"equity_curve": equity_curve, "metrics": metrics}
+    import asyncio
+
+    from app import checkpoints, metrics
+
+    if months_to_run is None or months_to_run > num_months() - start_month:
+        months_to_run = num_months() - start_month
+
+    store = loader.get_market_data_store()
+    run_id = await asyncio.to_thread(checkpoints.start_run, months_to_run, run_id, initial_state, start_month)
+    metrics.begin(run_id or checkpoints.new_run_id())
+
+    try:
+        stop = start_month + months_to_run
+        await asyncio.to_thread(preload_prices, store[start_month], store[stop - 1])
+
+        state = get_start_state(initial_state, start_month)
+        allocations = []
+
+        # the sync saver can't be awaited, so async runs compile the graph on an async one
+        async with checkpoints.aopen_checkpointer() as saver:
+            graph = build_graph(checkpointer=saver) if saver is not None else get_graph()
+
+            for month_idx, month_data in enumerate(store.iter_months(start_month, stop), start_month):
+                if month_idx > start_month:
+                    state = advance_month(state, month_data, equities, bonds)
+
+                logger.info(f"====== {month_data['month']} ======")
+                logger.debug("💿 STATE BEFORE | %s", state)
+                logger.info("⌛️ WORKFLOW | running monthly workflow")
+
+                config = checkpoints.month_config(run_id, month_idx) if run_id else None
+                with metrics.month_scope(month_data["month"], state) as month:
+                    state = month["state"] = await checkpoints.arun_month(graph, state, config)
+                equities, bonds = close_month(state, allocations)
+
+                logger.info("✅✅✅ WORKFLOW COMPLETE")
+                logger.debug("💿 STATE AFTER | %s", state)
+
+        if run_id:
+            await asyncio.to_thread(checkpoints.complete_run, run_id)
+        logger.info("✅✅✅ SIMULATION | completed")
+    finally:
+        run_metrics = await asyncio.to_thread(metrics.finish)
+    return {"final_state": state, "allocations": allocations, "run_id": run_id, "metrics": run_metrics}
+
+def resume(run_id: str):
+    """
+    Continues a checkpointed run. Months that finished are read back from their
+    checkpoints, and the interrupted month continues from its last completed node
+    (e.g. a crash in the Risk agent re-runs neither the research nor the CIO).
+    """
+    from app import checkpoints
+
+    run = checkpoints.get_run(run_id)
+    if run is None:
+        raise KeyError(f"No checkpointed simulation run {run_id!r}")
+    logger.info(f"♻️ CHECKPOINT | resuming run {run_id}")
+    return run_simulation(
+        run["months_to_run"], run_id=run_id, initial_state=run["initial_state"], start_month=run["start_month"],
+    )
+
+async def aresume(run_id: str):
+    """
+    Async twin of resume.
+    """
+    import asyncio
+
+    from app import checkpoints
+
+    run = await asyncio.to_thread(checkpoints.get_run, run_id)
+    if run is None:
+        raise KeyError(f"No checkpointed simulation run {run_id!r}")
+    logger.info(f"♻️ CHECKPOINT | resuming run {run_id}")
+    return await arun_simulation(
+        run["months_to_run"], run_id=run_id, initial_state=run["initial_state"], start_month=run["start_month"],
+    )
+
+def research_state(month_data: dict) -> SharedState:
+    """
+    The state a month's Analyst and Quant research runs on in the pipelined mode.
+    The previous allocation is not known yet, so it is left out of the research prompts.
+    """
+    year, month = loader.year_month(month_data)
+    return dict(market_data=month_data, current_month=month_data["month"], year=year, month=month)
+
+def run_pipelined_simulation(months_to_run: int = None, max_workers: int = 4, initial_state: dict = None):
+    """
+    Two-phase simulation.
+
+    Phase one fans the Analyst and Quant research for every month out over a pool of
+    `max_workers` threads. Research for month N only weakly depends on month N-1, so
+    apart from the first month it runs without the previous allocation.
+    Phase two runs the CIO -> Risk -> Execution chain month by month, in order, as soon
+    as each month's research lands, carrying capital and allocation forward.
+    """
+    from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+    from app import checkpoints, metrics
+    from app.agents.analyst_agent import analyst_agent_node
+    from app.agents.quant_agent import quant_agent_node
+
+    if months_to_run is None or months_to_run > num_months():
+        months_to_run = num_months()
+    # research fans out over every month at once, so this mode reads them all up front
+    months = list(loader.get_market_data_store().iter_months(stop=months_to_run))
+
+    # research runs outside the graph here, so it is timed as the graph nodes would be
+    analyst = metrics.timed_node("AnalystAgent", analyst_agent_node)
+    quant = metrics.timed_node("QuantAgent", quant_agent_node)
+    metrics.begin(checkpoints.new_run_id())
+
+    try:
+        preload_prices(months[0], months[-1])
+
+        state = get_initial_state(initial_state)
+        allocations = []
+
+        with ContextThreadPoolExecutor(max_workers=max_workers) as pool:
+            # ---- phase one: all research, concurrently ----
+            logger.info(f"⌛️ WORKFLOW | researching {months_to_run} months on {max_workers} workers")
+            research_states = [dict(state)] + [research_state(month_data) for month_data in months[1:]]
+            research = [
+                (pool.submit(analyst, research_state_), pool.submit(quant, research_state_))
+                for research_state_ in research_states
+            ]
+
+            # ---- phase two: the decision chain, in order ----
+            for month_idx, (analyst_future, quant_future) in enumerate(research):
+                logger.info(f"====== {months[month_idx]['month']} ======")
+                state.update(analyst_future.result())
+                state.update(quant_future.result())
+
+                logger.info("⌛️ WORKFLOW | running decision chain")
+                with metrics.month_scope(months[month_idx]["month"], state) as month:
+                    state = month["state"] = get_graph(research=False).invoke(state)
+                equities, bonds = close_month(state, allocations)
+                logger.info("✅✅✅ WORKFLOW COMPLETE")
+
+                if month_idx + 1 < months_to_run:
+                    state = advance_month(state, months[month_idx + 1], equities, bonds)
+
+        logger.info("✅✅✅ SIMULATION | completed")
+    finally:
+        run_metrics = metrics.finish()
+    return {"final_state": state, "allocations": allocations, "metrics": run_metrics}
+
+def portfolio_config(run_id: str, portfolio: str, month_idx: int) -> dict:
+    """
+    The checkpoint thread of one portfolio's month in a multi-portfolio run, e.g.
+    "<run_id>/<portfolio>/0003"; it is what a queued approval is keyed on.
+    """
+    return {"configurable": {"thread_id": f"{run_id}/{portfolio}/{month_idx:04d}"}}
+
+def run_portfolios(portfolios: dict, months_to_run: int = None, max_workers: int = 4):
+    """
+    Multi-portfolio simulation: one research pass per month, shared by every portfolio.
+
+    `portfolios` maps a name to that portfolio's overrides of the initial state, e.g.
+    {"cautious": {"capital": 5000, "prev_equity_allocation": 0.3, "prev_bond_allocation": 0.7}}.
+    Each month the Analyst and Quant run once, on a state without any previous
+    allocation (as the pipelined mode's research does), while the previous month's
+    decisions are still being made. Then the CIO -> Risk -> Execution chain runs once
+    per portfolio, on at most `max_workers` threads, each portfolio carrying its own
+    capital and split forward. Research costs O(months) instead of O(months x portfolios).
+
+    Each portfolio's months are checkpointed on their own thread (see portfolio_config),
+    so Warn/Block months are queued for approval as in run_simulation. The run as a
+    whole is not registered for resume: approvals.decide() on a portfolio's month
+    settles that month only, and the portfolio's later months keep the split held
+    before the decision.
+    Each portfolio's month is measured as its own month ("<month> / <portfolio>"),
+    with its own "month" event; the shared research is measured under the month.
+    Returns, per portfolio, its final state and executed allocations, plus the run id
+    and metrics.
+    """
+    from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+    from app import checkpoints, metrics
+    from app.agents.analyst_agent import analyst_agent_node
+    from app.agents.quant_agent import quant_agent_node
+    from app.config import get_settings
+
+    if months_to_run is None or months_to_run > num_months():
+        months_to_run = num_months()
+    store = loader.get_market_data_store()
+
+    analyst = metrics.timed_node("AnalystAgent", analyst_agent_node)
+    quant = metrics.timed_node("QuantAgent", quant_agent_node)
+    checkpointed = get_settings().checkpoints
+    graph = get_graph(research=False, checkpointed=checkpointed)
+    run_id = checkpoints.new_run_id()
+    metrics.begin(run_id)
+
+    def decide(name, state, month_idx):
+        config = portfolio_config(run_id, name, month_idx) if checkpointed else None
+        with metrics.month_scope(f"{state['current_month']} / {name}", state) as month:
+            month["state"] = checkpoints.run_month(graph, state, config)
+        return name, month["state"]
+
+    try:
+        preload_prices(store[0], store[months_to_run - 1])
+
+        states = {name: get_initial_state(overrides) for name, overrides in portfolios.items()}
+        allocations = {name: [] for name in portfolios}
+        splits = {}
+
+        with ContextThreadPoolExecutor(max_workers=max_workers) as pool:
+            def research(month_data):
+                research_state_ = research_state(month_data)
+                return pool.submit(analyst, research_state_), pool.submit(quant, research_state_)
+
+            months = store.iter_months(stop=months_to_run)
+            month_data = next(months)
+            pending = research(month_data)
+            for month_idx in range(months_to_run):
+                label = month_data["month"]
+                logger.info(f"====== {label} ======")
+                analyst_future, quant_future = pending
+                reports = {**analyst_future.result(), **quant_future.result()}
+
+                # next month's research overlaps this month's decisions
+                next_month = next(months, None)
+                if next_month is not None:
+                    pending = research(next_month)
+
+                logger.info(f"⌛️ WORKFLOW | running decision chain for {len(states)} portfolios")
+                decisions = []
+                for name, state in states.items():
+                    if month_idx > 0:
+                        state = advance_month(state, month_data, *splits[name])
+                    state.update(reports)
+                    decisions.append(pool.submit(decide, name, state, month_idx))
+                for decision in decisions:
+                    name, state = decision.result()
+                    states[name] = state
+                    splits[name] = close_month(state, allocations[name])
+                    logger.info(f"💼 PORTFOLIO | {name} | {label} | capital {state['capital']:.2f}, split {splits[name]}")
+                logger.info("✅✅✅ WORKFLOW COMPLETE")
+                month_data = next_month
+
+        logger.info(f"✅✅✅ SIMULATION | completed {len(states)} portfolios")
+    finally:
+        run_metrics = metrics.finish()
+    return {
+        "portfolios": {
+            name: {"final_state": states[name], "allocations": allocations[name]} for name in portfolios
+        },
+        "run_id": run_id,
+        "metrics": run_metrics,
+    }
+
+def backtest_simulation(start_date, end_date, allocations: list = None):
+    """
+    Historical backtest between `start_date` and `end_date`.
+
+    Applies each month's executed split to daily SPY/bond-proxy returns and compounds
+    the initial capital. If `allocations` (as returned by run_simulation) is not given,
+    the agents are run over the market_data months that fall inside the window (only
+    those, starting from the initial split); months without a decision carry the last
+    split forward.
+    """
+    import pandas as pd
+
+    from app import price_store, backtest
+
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1)
+
+    if allocations is None:
+        in_window = [
+            idx for idx, month in enumerate(loader.get_market_data_store())
+            if start <= pd.Timestamp(*loader.year_month(month), 1) < end
+        ]
+        allocations = (
+            run_simulation(len(in_window), start_month=in_window[0])["allocations"] if in_window else []
+        )
+
+    decisions = pd.DataFrame(
+        [(a["equities"], a["bonds"]) for a in allocations],
+        columns=backtest.ASSETS,
+        index=pd.PeriodIndex([pd.Period(pd.Timestamp(*convert_date(a["month"]), 1), freq="M") for a in allocations], freq="M"),
+    )
+
+    initial_state = get_initial_state()
+    price_store.prefetch([backtest.EQUITY_PROXY, backtest.BOND_PROXY], start - timedelta(days=7), end)
+    returns = backtest.daily_returns(start, end)
+    return backtest.run_backtest(
+        returns,
+        decisions,
+        capital=initial_state["capital"],
+        initial_allocation=(initial_state["prev_equity_allocation"], initial_state["prev_bond_allocation"]),
+    )
 
 if __name__ == "__main__":
-    # Example: run only 1 month by default
-    run_simulation(months_to_run=1)
+    import sys
+
+    if len(sys.argv) == 3 and sys.argv[1] == "--resume":
+        # Continue a crashed run: python -m app.main --resume <run_id>
+        resume(sys.argv[2])
+    elif len(sys.argv) == 2 and sys.argv[1] == "--review":
+        # Decide the allocations waiting for human approval
+        from app.approvals import review_pending
+        review_pending()
+    else:
+        # Example: run only 1 month by default
+        run_simulation(months_to_run=1)
 
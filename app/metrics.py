@@ -0,0 +1,394 @@
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.logger import log_event, logger, state_diff
+
+# (month, graph node) the current code runs for; set by the node wrappers and
+# inherited by the LLM calls, tool calls and cache lookups made inside the node
+current_scope: ContextVar[tuple] = ContextVar("metrics_scope", default=("", ""))
+# The month scope the current code runs in, if any: nodes inside it are attributed to
+# its label rather than their state's month (e.g. one month of one portfolio)
+current_month: ContextVar[Optional[str]] = ContextVar("metrics_month", default=None)
+
+PREFIX = "stratify"
+# LLM round trips an agent run takes at the least: the turn that answers (after any
+# tool turns) and the structured-response turn; skipping the run avoids them all
+AGENT_RUN_ROUND_TRIPS = 2
+
+
+def _counters() -> dict:
+    return {
+        "calls": 0, "seconds": 0.0,
+        "llm_round_trips": 0, "llm_seconds": 0.0, "llm_calls_avoided": 0,
+        "prompt_tokens": 0, "completion_tokens": 0, "prompt_tokens_saved": 0,
+        "rate_limit_wait_seconds": 0.0,
+        "tools": defaultdict(lambda: {"calls": 0, "seconds": 0.0, "errors": 0}),
+        "caches": defaultdict(lambda: {"hits": 0, "misses": 0}),
+    }
+
+
+class RunMetrics:
+    """
+        Everything measured during one simulation run, per month and graph node:
+        node wall time, LLM round trips to the provider with their tokens and latency,
+        the round trips deterministic shortcuts avoided, the prompt tokens compaction
+        saved, tool calls, cache hits and rate-limit waits, plus retries per provider.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.finished_at = None
+        self.retries = defaultdict(int)
+        self._months = {}
+        self._scopes = defaultdict(_counters)
+        self._lock = threading.Lock()
+
+    def _scope(self) -> dict:
+        return self._scopes[current_scope.get()]
+
+    def record_node(self, seconds: float):
+        with self._lock:
+            scope = self._scope()
+            scope["calls"] += 1
+            scope["seconds"] += seconds
+
+    def record_month(self, month: str, seconds: float):
+        with self._lock:
+            self._months[month] = self._months.get(month, 0.0) + seconds
+
+    def record_llm(self, prompt_tokens: int, completion_tokens: int, seconds: float):
+        with self._lock:
+            scope = self._scope()
+            scope["llm_round_trips"] += 1
+            scope["llm_seconds"] += seconds
+            scope["prompt_tokens"] += prompt_tokens
+            scope["completion_tokens"] += completion_tokens
+
+    def record_llm_avoided(self, count: int = 1):
+        """
+            LLM round trips a deterministic shortcut (e.g. the risk pre-screen) made
+            unnecessary; a skipped agent run counts AGENT_RUN_ROUND_TRIPS.
+        """
+        with self._lock:
+            self._scope()["llm_calls_avoided"] += count
+
+    def record_tokens_saved(self, tokens: int):
+        """
+            Prompt tokens app.compaction cut from what an LLM is sent.
+        """
+        with self._lock:
+            self._scope()["prompt_tokens_saved"] += tokens
+
+    def record_tool(self, tool: str, seconds: float, error: bool = False):
+        with self._lock:
+            counters = self._scope()["tools"][tool]
+            counters["calls"] += 1
+            counters["seconds"] += seconds
+            counters["errors"] += int(error)
+
+    def record_cache(self, cache: str, hit: bool):
+        with self._lock:
+            self._scope()["caches"][cache]["hits" if hit else "misses"] += 1
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._scope()["rate_limit_wait_seconds"] += seconds
+
+    def record_retry(self, provider: str, count: int = 1):
+        with self._lock:
+            self.retries[provider] += count
+
+    # ============ EXPORT ===============
+
+    def snapshot(self) -> dict:
+        """
+            The run as plain JSON-able data: totals, then a per-month, per-node breakdown.
+        """
+        with self._lock:
+            months = {month: {"month": month, "seconds": seconds, "nodes": {}} for month, seconds in self._months.items()}
+            totals = _counters()
+            for (month, node), scope in self._scopes.items():
+                entry = months.setdefault(month, {"month": month, "seconds": 0.0, "nodes": {}})
+                entry["nodes"][node or "(outside nodes)"] = _plain(scope)
+                _add(totals, scope)
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "wall_seconds": (self.finished_at or time.time()) - self.started_at,
+                "totals": _plain(totals),
+                "retries": dict(self.retries),
+                "months": list(months.values()),
+            }
+
+    def to_prometheus(self) -> str:
+        """
+            The run in the Prometheus text exposition format, one sample per month and node.
+        """
+        snapshot = self.snapshot()
+        families = defaultdict(list)
+        for month in snapshot["months"]:
+            base = {"run": self.run_id, "month": month["month"]}
+            families["month_seconds_total"].append((base, month["seconds"]))
+            for node, scope in month["nodes"].items():
+                labels = {**base, "node": node}
+                families["node_calls_total"].append((labels, scope["calls"]))
+                families["node_seconds_total"].append((labels, scope["seconds"]))
+                families["llm_round_trips_total"].append((labels, scope["llm_round_trips"]))
+                families["llm_seconds_total"].append((labels, scope["llm_seconds"]))
+                families["llm_calls_avoided_total"].append((labels, scope["llm_calls_avoided"]))
+                families["llm_tokens_total"].append(({**labels, "kind": "prompt"}, scope["prompt_tokens"]))
+                families["llm_tokens_total"].append(({**labels, "kind": "completion"}, scope["completion_tokens"]))
+                families["prompt_tokens_saved_total"].append((labels, scope["prompt_tokens_saved"]))
+                families["rate_limit_wait_seconds_total"].append((labels, scope["rate_limit_wait_seconds"]))
+                for tool, counters in scope["tools"].items():
+                    tool_labels = {**labels, "tool": tool}
+                    families["tool_calls_total"].append((tool_labels, counters["calls"]))
+                    families["tool_seconds_total"].append((tool_labels, counters["seconds"]))
+                    families["tool_errors_total"].append((tool_labels, counters["errors"]))
+                for cache, counters in scope["caches"].items():
+                    families["cache_hits_total"].append(({**labels, "cache": cache}, counters["hits"]))
+                    families["cache_misses_total"].append(({**labels, "cache": cache}, counters["misses"]))
+        for provider, count in snapshot["retries"].items():
+            families["retries_total"].append(({"run": self.run_id, "provider": provider}, count))
+
+        lines = []
+        for name, samples in families.items():
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            for labels, value in samples:
+                rendered = ",".join(f'{key}="{_escape(value_)}"' for key, value_ in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{rendered}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str) -> dict:
+        """
+            Writes <run_id>.json and <run_id>.prom to `directory`, returns their paths.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = {"json": os.path.join(directory, f"{self.run_id}.json"), "prometheus": os.path.join(directory, f"{self.run_id}.prom")}
+        with open(paths["json"], "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        with open(paths["prometheus"], "w") as f:
+            f.write(self.to_prometheus())
+        return paths
+
+
+def _plain(scope: dict) -> dict:
+    return {
+        **{key: value for key, value in scope.items() if key not in ("tools", "caches")},
+        "tools": {tool: dict(counters) for tool, counters in scope["tools"].items()},
+        "caches": {cache: dict(counters) for cache, counters in scope["caches"].items()},
+    }
+
+def _add(totals: dict, scope: dict):
+    for key, value in scope.items():
+        if key in ("tools", "caches"):
+            for name, counters in value.items():
+                for counter, amount in counters.items():
+                    totals[key][name][counter] += amount
+        else:
+            totals[key] += value
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# ============ ACTIVE RUN ===============
+
+# The run measured in this context (graph nodes and tools inherit it), so runs on
+# different threads keep apart. Work a run hands to a thread pool must carry the
+# context along (ContextThreadPoolExecutor, or copy_context().run); records made
+# outside any run are dropped.
+_current: ContextVar[Optional[RunMetrics]] = ContextVar("metrics_run", default=None)
+
+
+def active() -> Optional[RunMetrics]:
+    return _current.get()
+
+def begin(run_id: str) -> RunMetrics:
+    run = RunMetrics(run_id)
+    _current.set(run)
+    return run
+
+def finish() -> Optional[dict]:
+    """
+        Ends the active run and exports it to CACHE_DIR/metrics. Returns its snapshot.
+    """
+    run = active()
+    _current.set(None)
+    if run is None:
+        return None
+    run.finished_at = time.time()
+
+    from app.config import get_settings
+
+    paths = run.export(metrics_dir(get_settings().cache_dir))
+    snapshot = run.snapshot()
+    totals = snapshot["totals"]
+    logger.info(
+        f"📈 METRICS | {run.run_id} | {totals['llm_round_trips']} LLM round trips, "
+        f"{totals['prompt_tokens'] + totals['completion_tokens']} tokens | {paths['json']}"
+    )
+    return snapshot
+
+def metrics_dir(cache_dir: str) -> str:
+    return os.path.join(cache_dir, "metrics")
+
+def load(directory: str, run_id: str = None) -> Optional[dict]:
+    """
+        A run's exported snapshot, the most recent one if `run_id` is not given.
+    """
+    if run_id is None:
+        paths = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime)
+        if not paths:
+            return None
+        path = paths[-1]
+    else:
+        path = os.path.join(directory, f"{run_id}.json")
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _record(method: str, *args, **kwargs):
+    run = active()
+    if run is not None:
+        getattr(run, method)(*args, **kwargs)
+
+record_llm = functools.partial(_record, "record_llm")
+record_llm_avoided = functools.partial(_record, "record_llm_avoided")
+record_tokens_saved = functools.partial(_record, "record_tokens_saved")
+record_tool = functools.partial(_record, "record_tool")
+record_cache = functools.partial(_record, "record_cache")
+record_wait = functools.partial(_record, "record_wait")
+record_retry = functools.partial(_record, "record_retry")
+
+# ============ INSTRUMENTATION ===============
+
+@contextmanager
+def node_scope(node: str, state: dict):
+    """
+        Attributes everything inside to (month, node), records the node's wall time and
+        logs a "node" event with the state update it yields (put it in outcome["update"]).
+        The month is the enclosing month scope's, or else the state's.
+    """
+    month = current_month.get() or state.get("current_month", "")
+    # a shallow copy from before the node runs: nodes may change the state in place,
+    # and the diff is rendered later, on the logging thread
+    before = dict(state)
+    token = current_scope.set((month, node))
+    started = time.perf_counter()
+    outcome = {}
+    try:
+        yield outcome
+    except BaseException as e:
+        # GraphInterrupt included: the HumanNode pausing for approval shows up here
+        outcome["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _record("record_node", seconds)
+        current_scope.reset(token)
+        update = dict(outcome["update"]) if isinstance(outcome.get("update"), dict) else None
+        log_event(
+            "node",
+            run_id=active().run_id if active() else None,
+            month=month,
+            node=node,
+            seconds=round(seconds, 6),
+            error=outcome.get("error"),
+            diff=lambda: state_diff(before, update) if update is not None else None,
+        )
+
+@contextmanager
+def month_scope(month: str, state: dict):
+    """
+        Records a month's wall time and logs a "month" event with what the month
+        changed in `state` (put the month's final state in outcome["state"]).
+        Nodes run inside are attributed to `month`.
+    """
+    before = dict(state)
+    token = current_month.set(month)
+    started = time.perf_counter()
+    outcome = {}
+    try:
+        yield outcome
+    finally:
+        seconds = time.perf_counter() - started
+        current_month.reset(token)
+        _record("record_month", month, seconds)
+        after = dict(outcome["state"]) if outcome.get("state") is not None else None
+        log_event(
+            "month",
+            run_id=active().run_id if active() else None,
+            month=month,
+            seconds=round(seconds, 6),
+            diff=lambda: state_diff(before, after) if after is not None else None,
+        )
+
+def timed_node(node: str, func, afunc=None):
+    """
+        Wraps a graph node (and its async twin) in node_scope. The wrappers keep the
+        wrapped signatures, so RunnableLambda still passes `config` to nodes that take it.
+    """
+    @functools.wraps(func)
+    def wrapper(state, **kwargs):
+        with node_scope(node, state) as outcome:
+            outcome["update"] = func(state, **kwargs)
+            return outcome["update"]
+
+    if afunc is None:
+        return wrapper
+
+    @functools.wraps(afunc)
+    async def awrapper(state, **kwargs):
+        with node_scope(node, state) as outcome:
+            outcome["update"] = await afunc(state, **kwargs)
+            return outcome["update"]
+
+    return wrapper, awrapper
+
+
+class ToolMetricsCallback(BaseCallbackHandler):
+    """
+        Times every tool call it is attached to, in the scope of the calling node.
+    """
+
+    def __init__(self):
+        self._started = {}
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = ((serialized or {}).get("name") or kwargs.get("name", "tool"), time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        name, started = self._started.pop(run_id, ("tool", time.perf_counter()))
+        record_tool(name, time.perf_counter() - started)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        name, started = self._started.pop(run_id, ("tool", time.perf_counter()))
+        record_tool(name, time.perf_counter() - started, error=True)
+
+
+tool_callback = ToolMetricsCallback()
+
+
+class _RetryCounter(logging.Handler):
+    """
+        Counts the OpenAI client's own retries, which it only reports through its logger.
+    """
+
+    def emit(self, record):
+        if record.getMessage().startswith("Retrying request"):
+            record_retry("openai")
+
+
+logging.getLogger("openai._base_client").addHandler(_RetryCounter())
@@ -1,12 +1,18 @@
+import asyncio
 from langgraph.graph import StateGraph
-from langchain_core.runnables import RunnableLambda
+from langgraph.types import interrupt
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
+from app import approvals
+from app.config import get_settings
 from app.types import HumanApproval
 
 from app.logger import logger
 
-def human_node(state):
-    logger.info("👱‍♂️ HUMAN APPROVAL | human approval required")
+def console_approval(state) -> HumanApproval:
+    """
+        Asks at the console, blocking until someone answers.
+    """
     print("👱‍♂️ HUMAN APPROVAL | human approval required. Enter your choice")
     print("The proposed split is: ")
     print(f"{state['CIO_report'].equities} for equities")
@@ -29,9 +35,46 @@ def human_node(state):
                 print("Invalid input, please try again")
                 continue
         is_valid = True
-    state["human_approval"] = human_input
+    return human_input
+
+def human_node(state, config: RunnableConfig = None):
+    """
+        Decides a Warn/Block month: by policy when one applies, otherwise through the
+        approval queue. The month's graph is interrupted until the decision lands
+        (see approvals.decide). APPROVAL_MODE=console asks at the console instead.
+
+        A graph without a checkpoint thread (the pipelined chain, runs with
+        CHECKPOINTS=false, sweep workers) cannot be paused and resumed, and may have
+        nobody at a console: it rejects the move, holding the previous split, as a
+        queued month is booked while it waits.
+    """
+    logger.info("👱‍♂️ HUMAN APPROVAL | human approval required")
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+
+    decision = approvals.policy_decision(state)
+    if decision is not None:
+        logger.info(f"👱‍♂️ HUMAN APPROVAL | {decision.value} by policy")
+    elif get_settings().approval_mode == "console":
+        decision = console_approval(state)
+    elif thread_id is None:
+        decision = HumanApproval.reject
+        logger.warning("👱‍♂️ HUMAN APPROVAL | no checkpoint thread to queue on, holding the previous split")
+    else:
+        queue = approvals.get_approval_queue()
+        # a decision recorded while the month was paused wins over asking again
+        decision = queue.decision(thread_id)
+        if decision is None:
+            request = approvals.approval_request(state)
+            queue.submit(thread_id, request)
+            logger.info(f"⏸️ HUMAN APPROVAL | {thread_id} queued for review")
+            decision = HumanApproval(interrupt(request))
 
-    logger.info(f"👱‍♂️ HUMAN APPROVAL | {human_input} was selected")
+    state["human_approval"] = decision
+    logger.info(f"👱‍♂️ HUMAN APPROVAL | {decision} was selected")
     return state
 
-human_approval = RunnableLambda(human_node)
+async def ahuman_node(state, config: RunnableConfig = None):
+    # input() blocks, keep it off the event loop
+    return await asyncio.to_thread(human_node, state, config)
+
+human_approval = RunnableLambda(human_node, afunc=ahuman_node)
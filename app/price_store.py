@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from app.config import get_settings
+from app.utils import open_sqlite
+
+from app.logger import logger
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    symbol   TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    date     TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, interval, date)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol     TEXT NOT NULL,
+    interval   TEXT NOT NULL,
+    start      TEXT NOT NULL,
+    end        TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_lookup ON coverage (symbol, interval, start, end);
+"""
+
+
+def _as_date(value) -> date:
+    return pd.Timestamp(value).date()
+
+
+class PriceStore:
+    """
+        Persistent SQLite store of OHLCV bars, keyed by symbol/interval/date.
+
+        Every download records the [start, end) range it covered, so a later read
+        of any sub-range is served from disk. A range downloaded after its end
+        date never goes stale; one downloaded while still open (e.g. mid-month,
+        even if it has since passed) is re-downloaded once it is older than
+        `stale_after` seconds. In offline mode the network is never touched and
+        whatever is on disk is returned.
+    """
+
+    def __init__(self, path: str, offline: bool = False, stale_after: float = 3600):
+        self.path = path
+        self.offline = offline
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.executescript(SCHEMA)
+        # in-memory (symbol, date) frame for the current run and the window it covers
+        # (symbols, start, end, interval), swapped together; see load_panel
+        self._panel_state = None
+
+    # ---------- public API ----------
+
+    def get(self, symbol: str, start, end, interval: str = "1d") -> pd.DataFrame:
+        """
+            Daily bars for `symbol` in [start, end), read through the store.
+        """
+        start, end = _as_date(start), _as_date(end)
+        cached = self._slice_panel(symbol, start, end, interval)
+        if cached is not None:
+            return cached
+        if not self.offline and not self.is_covered(symbol, start, end, interval):
+            self._fetch([symbol], start, end, interval)
+        return self._read(symbol, start, end, interval)
+
+    def load_panel(self, symbols, start, end, interval: str = "1d") -> pd.DataFrame:
+        """
+            Loads every symbol for a whole window (one batched download at most)
+            into a single in-memory frame indexed by (symbol, date). Later `get`
+            calls inside the window are served by slicing it, without the
+            `stale_after` check: the panel stays as loaded until the next call.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        start, end = _as_date(start), _as_date(end)
+        self.prefetch(symbols, start, end, interval)
+        placeholders = ", ".join("?" for _ in symbols)
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT symbol, date, open, high, low, close, volume FROM prices "
+                f"WHERE symbol IN ({placeholders}) AND interval = ? AND date >= ? AND date < ?",
+                self._conn,
+                params=(*symbols, interval, start.isoformat(), end.isoformat()),
+            )
+        df.columns = ["symbol", "Date"] + COLUMNS
+        df["Date"] = pd.to_datetime(df["Date"])
+        panel = df.set_index(["symbol", "Date"]).sort_index()
+        window = (frozenset(panel.index.unique("symbol")), start, end, interval)
+        with self._lock:
+            self._panel_state = (panel, window)
+        return panel
+
+    def prefetch(self, symbols, start, end, interval: str = "1d") -> list:
+        """
+            Fills the store for a whole window with a single batched download.
+            Only symbols that are not already covered are fetched.
+
+            Returns:
+                list: The symbols that were downloaded (none when offline).
+        """
+        start, end = _as_date(start), _as_date(end)
+        missing = [s for s in dict.fromkeys(symbols) if not self.is_covered(s, start, end, interval)]
+        if not missing or self.offline:
+            return []
+        self._fetch(missing, start, end, interval)
+        return missing
+
+    def is_covered(self, symbol: str, start, end, interval: str = "1d") -> bool:
+        start, end = _as_date(start), _as_date(end)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT end, fetched_at FROM coverage "
+                "WHERE symbol = ? AND interval = ? AND start <= ? AND end >= ?",
+                (symbol, interval, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return any(self._is_fresh(end, fetched_at) for _, fetched_at in rows)
+
+    # ---------- internals ----------
+
+    def _slice_panel(self, symbol: str, start: date, end: date, interval: str):
+        # read once, so a concurrent load_panel can't pair one panel with another's window
+        panel_state = self._panel_state
+        if panel_state is None:
+            return None
+        panel, (symbols, panel_start, panel_end, panel_interval) = panel_state
+        if symbol not in symbols or interval != panel_interval:
+            return None
+        if start < panel_start or end > panel_end:
+            return None
+        rows = panel.xs(symbol, level="symbol")
+        return rows[(rows.index >= pd.Timestamp(start)) & (rows.index < pd.Timestamp(end))]
+
+    def _is_fresh(self, end: date, fetched_at: float) -> bool:
+        if fetched_at >= datetime(end.year, end.month, end.day).timestamp():
+            # fetched after the range closed, the bars will not change
+            return True
+        # fetched while the range was still open (e.g. mid-month): it may be missing bars
+        return time.time() - fetched_at < self.stale_after
+
+    def _fetch(self, symbols: list, start: date, end: date, interval: str):
+        # yfinance is slow to import and offline runs never need it
+        import yfinance as yf
+
+        logger.info(f"💾 PRICE STORE | downloading {', '.join(symbols)} from {start} to {end}")
+        raw = yf.download(
+            list(symbols),
+            start=start.isoformat(),
+            end=end.isoformat(),
+            interval=interval,
+            progress=False,
+            auto_adjust=True,
+        )
+        frame = _to_long(raw, symbols)
+        rows = [
+            (r.symbol, interval, r.date, r.Open, r.High, r.Low, r.Close, r.Volume)
+            for r in frame.itertuples(index=False)
+        ]
+        fetched_at = time.time()
+        returned = set(frame["symbol"])
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany(
+                "INSERT INTO coverage VALUES (?, ?, ?, ?, ?)",
+                [
+                    (s, interval, start.isoformat(), end.isoformat(), fetched_at)
+                    for s in symbols
+                    if s in returned
+                ],
+            )
+
+    def _read(self, symbol: str, start: date, end: date, interval: str) -> pd.DataFrame:
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT date, open, high, low, close, volume FROM prices "
+                "WHERE symbol = ? AND interval = ? AND date >= ? AND date < ? ORDER BY date",
+                self._conn,
+                params=(symbol, interval, start.isoformat(), end.isoformat()),
+            )
+        df.columns = ["Date"] + COLUMNS
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date")
+
+
+def _to_long(raw: pd.DataFrame, symbols: list) -> pd.DataFrame:
+    """
+        Flattens a yf.download frame ((Price, Ticker) columns) into one row per
+        (symbol, date), dropping the days a symbol did not trade.
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=["symbol", "date"] + COLUMNS)
+    if isinstance(raw.columns, pd.MultiIndex):
+        long = raw.stack(level=1, future_stack=True)
+    else:
+        long = raw.assign(Ticker=symbols[0]).set_index("Ticker", append=True)
+    long.index.names = ["date", "symbol"]
+    long = long.reset_index().dropna(subset=["Close"])
+    long["date"] = pd.to_datetime(long["date"]).dt.strftime("%Y-%m-%d")
+    return long[["symbol", "date"] + COLUMNS]
+
+
+@lru_cache(maxsize=1)
+def get_price_store() -> PriceStore:
+    """
+        The process-wide price store, configured from settings.
+    """
+    settings = get_settings()
+    return PriceStore(
+        path=os.path.join(settings.cache_dir, "prices.sqlite"),
+        offline=settings.prices_offline,
+        stale_after=settings.prices_stale_after_minutes * 60,
+    )
+
+
+def prefetch(symbols, start, end, interval: str = "1d") -> list:
+    """
+        Fills the process-wide price store for a backtest window in one go.
+    """
+    return get_price_store().prefetch(symbols, start, end, interval)
+
+
+def load_panel(symbols, start, end, interval: str = "1d") -> pd.DataFrame:
+    """
+        Loads a whole simulation window into the process-wide in-memory panel.
+    """
+    return get_price_store().load_panel(symbols, start, end, interval)
+
+
+if __name__ == "__main__":
+    prefetch(["SPY", "^IRX"], "2023-01-01", "2023-04-01")
+    print(get_price_store().get("SPY", "2023-01-01", "2023-02-01"))
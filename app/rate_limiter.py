@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+from langchain_openai import ChatOpenAI
+
+from app import metrics
+from app.tokens import count_message_tokens, count_tokens
+from app.logger import logger
+
+# Completion tokens reserved per LLM call on top of the counted prompt tokens
+COMPLETION_TOKENS_ESTIMATE = 512
+
+# How often a waiting coroutine re-checks for a free in-flight slot
+IN_FLIGHT_POLL_SECONDS = 0.05
+
+
+class TokenBucket:
+    """
+        Thread-safe token bucket refilled continuously at `per_minute`.
+
+        `reserve` never blocks: it takes the tokens, letting the balance go negative,
+        and returns how long the caller must wait for them. Callers are therefore
+        served in arrival order and the long-run rate never exceeds the limit.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+
+class ProviderLimiter:
+    """
+        Process-wide governor for one provider: requests/min, tokens/min and a cap
+        on calls in flight. Every agent and tool talking to the provider goes through
+        the same instance, so parallel runs stay at the provider's limit instead of
+        going over it and backing off on 429s.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self.waited_seconds = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            self.waited_seconds += wait
+            metrics.record_wait(wait)
+            logger.debug(f"🚦 RATE LIMITER | {self.name} | waiting {wait:.2f}s")
+        return wait
+
+    @contextmanager
+    def limit(self, tokens: int = 0):
+        # wait for the rate first, so sleeping callers don't hold an in-flight slot
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        if self.in_flight is not None:
+            self.in_flight.acquire()
+        try:
+            yield
+        finally:
+            if self.in_flight is not None:
+                self.in_flight.release()
+
+    @asynccontextmanager
+    async def alimit(self, tokens: int = 0):
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        # the slot is a thread semaphore shared with sync callers, so poll instead of blocking the loop
+        if self.in_flight is not None:
+            while not self.in_flight.acquire(blocking=False):
+                await asyncio.sleep(IN_FLIGHT_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            if self.in_flight is not None:
+                self.in_flight.release()
+
+
+_limiters: dict = {}
+
+
+def register(limiter: ProviderLimiter) -> ProviderLimiter:
+    _limiters[limiter.name] = limiter
+    return limiter
+
+
+def get_limiter(name: str) -> ProviderLimiter:
+    if not _limiters:
+        # built from settings on first use
+        from app.config import register_limiters
+        register_limiters()
+    return _limiters[name]
+
+
+class GovernedChatOpenAI(ChatOpenAI):
+    """
+        ChatOpenAI whose API calls go through the process-wide "openai" limiter,
+        reserving the prompt's tiktoken count plus a completion estimate.
+        Cache hits are answered before _generate, so they are never throttled, and
+        every call that gets here is a round trip to the provider: it is recorded in
+        app.metrics with its latency and token usage.
+    """
+
+    def _estimate_tokens(self, messages) -> int:
+        completion = self.max_tokens or COMPLETION_TOKENS_ESTIMATE
+        return count_message_tokens(messages, self.model_name) + completion
+
+    def _record_round_trip(self, messages, result, started: float):
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is None:
+            # the provider did not report usage (e.g. a stand-in model), count it ourselves
+            prompt_tokens = count_message_tokens(messages, self.model_name)
+            completion_tokens = sum(count_tokens(generation.text, self.model_name) for generation in result.generations)
+        metrics.record_llm(prompt_tokens, completion_tokens or 0, time.perf_counter() - started)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with get_limiter("openai").limit(tokens=self._estimate_tokens(messages)):
+            started = time.perf_counter()
+            result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record_round_trip(messages, result, started)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async with get_limiter("openai").alimit(tokens=self._estimate_tokens(messages)):
+            started = time.perf_counter()
+            result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record_round_trip(messages, result, started)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        with get_limiter("openai").limit(tokens=self._estimate_tokens(messages)):
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async with get_limiter("openai").alimit(tokens=self._estimate_tokens(messages)):
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
@@ -0,0 +1,331 @@
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Union
+
+from app.config import Settings, get_settings
+from app.utils import open_sqlite
+
+from app.logger import logger
+
+# What a scenario may override: fields of the initial state, and the risk policy
+# settings, which the nodes read on every call
+INITIAL_STATE_FIELDS = ("capital", "prev_equity_allocation", "prev_bond_allocation")
+POLICY_SETTINGS = (
+    "approval_mode",
+    "auto_approve_warn_max_shift",
+    "auto_reject_block",
+    "cio_max_questions",
+    "cio_max_debate_tokens",
+    "cio_debate_seconds",
+)
+# Provider limits are process-wide, so the pool splits them between its workers
+WORKER_LIMITS = (
+    "openai_requests_per_minute",
+    "openai_tokens_per_minute",
+    "openai_max_in_flight",
+    "serper_requests_per_minute",
+    "serper_max_in_flight",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweep_results (
+    sweep_id          TEXT NOT NULL,
+    scenario          INTEGER NOT NULL,
+    overrides         TEXT NOT NULL,
+    run_id            TEXT,
+    months            INTEGER,
+    final_capital     REAL,
+    final_equities    REAL,
+    final_bonds       REAL,
+    awaiting_approval INTEGER,
+    llm_round_trips   INTEGER,
+    seconds           REAL,
+    error             TEXT,
+    allocations       TEXT,
+    completed_at      REAL NOT NULL,
+    PRIMARY KEY (sweep_id, scenario)
+);
+"""
+RESULT_FIELDS = (
+    "sweep_id", "scenario", "overrides", "run_id", "months", "final_capital", "final_equities", "final_bonds",
+    "awaiting_approval", "llm_round_trips", "seconds", "error", "allocations", "completed_at",
+)
+
+
+class SweepResults:
+    """
+        One table of results for every sweep, a row per scenario. Only the process
+        running the sweep writes to it, as each scenario finishes.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.executescript(SCHEMA)
+
+    def add(self, row: dict):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO sweep_results ({', '.join(RESULT_FIELDS)}) "
+                f"VALUES ({', '.join('?' for _ in RESULT_FIELDS)})",
+                tuple(
+                    json.dumps(row[field]) if field in ("overrides", "allocations") else row[field]
+                    for field in RESULT_FIELDS
+                ),
+            )
+
+    def rows(self, sweep_id: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(RESULT_FIELDS)} FROM sweep_results WHERE sweep_id = ? ORDER BY scenario",
+                (sweep_id,),
+            ).fetchall()
+        results = []
+        for row in rows:
+            result = dict(zip(RESULT_FIELDS, row))
+            result["overrides"] = json.loads(result["overrides"])
+            result["allocations"] = json.loads(result["allocations"]) if result["allocations"] else None
+            results.append(result)
+        return results
+
+    def sweeps(self) -> list:
+        """
+            Every sweep's id, most recent first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sweep_id FROM sweep_results GROUP BY sweep_id ORDER BY MAX(completed_at) DESC"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+@lru_cache(maxsize=1)
+def get_sweep_results() -> SweepResults:
+    return SweepResults(os.path.join(get_settings().cache_dir, "sweeps.sqlite"))
+
+# ============ SCENARIOS ===============
+
+def expand_grid(grid: Union[dict, Iterable[dict]]) -> list:
+    """
+        The scenarios of a sweep. A dict of lists is expanded into every combination,
+        e.g. {"capital": [1000, 5000], "auto_reject_block": [False, True]} gives four;
+        a list of dicts is taken as the scenarios themselves.
+        A scenario giving only one side of the starting split gets the other as its
+        complement, e.g. prev_equity_allocation 0.8 gives prev_bond_allocation 0.2.
+        Raises ValueError on a field a scenario cannot override, a bad policy value, or
+        a starting split that does not sum to 1.
+    """
+    from pydantic import TypeAdapter
+
+    if isinstance(grid, dict):
+        keys = list(grid)
+        scenarios = [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+    else:
+        scenarios = [dict(scenario) for scenario in grid]
+
+    for scenario in scenarios:
+        unknown = set(scenario) - set(INITIAL_STATE_FIELDS) - set(POLICY_SETTINGS)
+        if unknown:
+            raise ValueError(f"Scenarios can only override {INITIAL_STATE_FIELDS + POLICY_SETTINGS}, not {sorted(unknown)}")
+        for key in set(scenario) & set(POLICY_SETTINGS):
+            scenario[key] = TypeAdapter(Settings.model_fields[key].annotation).validate_python(scenario[key])
+        _complete_split(scenario)
+        if scenario.get("approval_mode") == "console":
+            # a worker has no terminal to ask at
+            raise ValueError("Sweeps cannot use approval_mode='console'")
+    return scenarios
+
+def _complete_split(scenario: dict):
+    sides = ("prev_equity_allocation", "prev_bond_allocation")
+    given = [side for side in sides if side in scenario]
+    if len(given) == 1:
+        other = sides[1 - sides.index(given[0])]
+        scenario[other] = round(1 - scenario[given[0]], 10)
+    elif given and abs(scenario[sides[0]] + scenario[sides[1]] - 1) > 1e-6:
+        # anything else would be booked as leverage (or idle cash) by the backtest
+        raise ValueError(f"The starting split must sum to 1, got {scenario[sides[0]]} / {scenario[sides[1]]}")
+
+@contextmanager
+def policy(overrides: dict):
+    """
+        Applies risk policy settings to this process's settings for the duration.
+    """
+    settings = get_settings()
+    saved = {key: getattr(settings, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    try:
+        yield settings
+    finally:
+        for key, value in saved.items():
+            setattr(settings, key, value)
+
+def run_scenario(scenario: dict, months_to_run: Optional[int] = None) -> dict:
+    """
+        Runs one scenario in this process and summarises it. A failed run is reported
+        in the summary's `error` rather than raised, so it does not end the sweep.
+    """
+    from app.main import run_simulation
+
+    initial_state = {key: value for key, value in scenario.items() if key in INITIAL_STATE_FIELDS}
+    settings = {key: value for key, value in scenario.items() if key in POLICY_SETTINGS}
+    started = time.perf_counter()
+    try:
+        with policy(settings):
+            result = run_simulation(months_to_run, initial_state=initial_state)
+    except Exception as e:
+        logger.error(f"🧪 SWEEP | scenario {scenario} failed: {e}")
+        return {
+            "run_id": None, "months": None, "final_capital": None, "final_equities": None, "final_bonds": None,
+            "awaiting_approval": None, "llm_round_trips": None, "allocations": None,
+            "seconds": time.perf_counter() - started,
+            "error": "".join(traceback.format_exception_only(type(e), e)).strip(),
+        }
+
+    allocations = result["allocations"]
+    last = allocations[-1] if allocations else {}
+    return {
+        "run_id": result.get("run_id") or result["metrics"]["run_id"],
+        "months": len(allocations),
+        "final_capital": float(result["final_state"]["capital"]),
+        "final_equities": last.get("equities"),
+        "final_bonds": last.get("bonds"),
+        "awaiting_approval": sum(allocation["awaiting_approval"] for allocation in allocations),
+        "llm_round_trips": result["metrics"]["totals"]["llm_round_trips"],
+        "allocations": allocations,
+        "seconds": time.perf_counter() - started,
+        "error": None,
+    }
+
+# ============ POOL ===============
+
+def _init_worker(environ: dict):
+    # runs before the worker reads its settings
+    os.environ.update(environ)
+
+def worker_environ(workers: int, console: str = "off") -> dict:
+    """
+        The environment of a worker process: its share of the provider limits, so the
+        pool as a whole keeps to them, and its console logging (off by default, the
+        run logs still go to logs/). Approvals are always queued on checkpoint threads,
+        whatever .env says: a worker has no terminal to ask at.
+    """
+    settings = get_settings()
+    environ = {name.upper(): str(max(1, getattr(settings, name) // workers)) for name in WORKER_LIMITS}
+    environ["LOG_CONSOLE"] = console
+    environ["APPROVAL_MODE"] = "queue"
+    environ["CHECKPOINTS"] = "true"
+    return environ
+
+def iter_sweep(
+    grid: Union[dict, Iterable[dict]],
+    months_to_run: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    sweep_id: Optional[str] = None,
+    console: str = "off",
+) -> Iterator[dict]:
+    """
+        Runs every scenario of `grid` (see expand_grid) through run_simulation, in a
+        pool of worker processes, and yields each scenario's result as it finishes,
+        after adding it to the sweep_results table.
+
+        All workers share the caches in CACHE_DIR: the prices are loaded into the price
+        store once, before the pool starts, and the LLM and search caches are shared
+        SQLite files. With a worker per scenario (the default, up to SWEEP_MAX_WORKERS),
+        the sweep takes about as long as its slowest scenario, provider limits allowing:
+        the limits are split between the workers.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import multiprocessing
+
+    from app import checkpoints, loader
+    from app.main import num_months, preload_prices
+
+    scenarios = expand_grid(grid)
+    if not scenarios:
+        return
+    sweep_id = sweep_id or checkpoints.new_run_id()
+    workers = min(max_workers or len(scenarios), len(scenarios), get_settings().sweep_max_workers)
+    if months_to_run is None or months_to_run > num_months():
+        months_to_run = num_months()
+
+    store = loader.get_market_data_store()
+    preload_prices(store[0], store[months_to_run - 1])
+    results = get_sweep_results()
+
+    logger.info(f"🧪 SWEEP | {sweep_id} | {len(scenarios)} scenarios over {months_to_run} months on {workers} workers")
+    # spawn, not fork: the parent holds open SQLite connections and the logging thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(worker_environ(workers, console),)
+    ) as pool:
+        futures = {pool.submit(run_scenario, scenario, months_to_run): index for index, scenario in enumerate(scenarios)}
+        for future in as_completed(futures):
+            index = futures[future]
+            row = {"sweep_id": sweep_id, "scenario": index, "overrides": scenarios[index], **future.result(),
+                   "completed_at": time.time()}
+            results.add(row)
+            status = f"failed: {row['error']}" if row["error"] else f"capital {row['final_capital']:.2f}"
+            logger.info(f"🧪 SWEEP | {sweep_id} | scenario {index} {scenarios[index]} | {status} in {row['seconds']:.1f}s")
+            yield row
+    logger.info(f"✅ SWEEP | {sweep_id} | completed")
+
+def sweep(
+    grid: Union[dict, Iterable[dict]],
+    months_to_run: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    sweep_id: Optional[str] = None,
+    console: str = "off",
+):
+    """
+        Runs a whole sweep (see iter_sweep) and returns its results table.
+    """
+    from app import checkpoints
+
+    sweep_id = sweep_id or checkpoints.new_run_id()
+    for _ in iter_sweep(grid, months_to_run, max_workers, sweep_id, console):
+        pass
+    return results(sweep_id)
+
+def results(sweep_id: Optional[str] = None):
+    """
+        A sweep's results as a DataFrame, a row per scenario with its overrides as
+        columns. The most recent sweep if `sweep_id` is not given.
+    """
+    import pandas as pd
+
+    store = get_sweep_results()
+    if sweep_id is None:
+        sweeps = store.sweeps()
+        if not sweeps:
+            return pd.DataFrame()
+        sweep_id = sweeps[0]
+    rows = store.rows(sweep_id)
+    overrides = pd.DataFrame([row["overrides"] for row in rows])
+    table = pd.DataFrame([{k: v for k, v in row.items() if k not in ("overrides", "allocations")} for row in rows])
+    return pd.concat([overrides, table], axis=1)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        # python -m app.sweep grid.json [months]
+        with open(sys.argv[1], "r") as f:
+            grid = json.load(f)
+        months = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    else:
+        # Example: three starting splits, with and without auto-rejecting blocks, for one month
+        grid = [
+            {"prev_equity_allocation": equities, "prev_bond_allocation": round(1 - equities, 2), "auto_reject_block": reject}
+            for equities in (0.4, 0.6, 0.8)
+            for reject in (False, True)
+        ]
+        months = 1
+    print(sweep(grid, months).to_string())
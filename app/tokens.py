@@ -0,0 +1,62 @@
+from functools import lru_cache
+
+from app.logger import logger
+
+# Rough OpenAI rule of thumb, used when the tiktoken encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format (role, separators)
+TOKENS_PER_MESSAGE = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken downloads its encodings on first use; offline we fall back to an estimate
+        logger.warning(f"🔢 TOKENS | tiktoken unavailable ({type(e).__name__}), estimating from length")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+        Number of tokens `text` takes for `model`.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model: str = "gpt-3.5-turbo") -> int:
+    """
+        Prompt tokens of a list of chat messages, tool calls included.
+    """
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        total += TOKENS_PER_MESSAGE + count_tokens(content, model)
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            total += count_tokens(str(tool_call.get("args", "")), model)
+    return total
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """
+        `text` cut to `max_tokens` tokens, including a note of its original length.
+        Text within the limit (a truncated text included) is returned as is.
+    """
+    total = count_tokens(text, model)
+    if total <= max_tokens:
+        return text
+    note = f" … [truncated from {total} tokens]"
+    keep = max(max_tokens - count_tokens(note, model), 0)
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:keep * CHARS_PER_TOKEN] + note
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:keep]) + note
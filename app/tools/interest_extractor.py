@@ -1,15 +1,46 @@
 import re
-from app.config import LLM
-from app.types import InterestRateAnalysis
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.messages import HumanMessage
 from langgraph.prebuilt import create_react_agent
 
+from app.config import get_llm
+from app.types import ChangeType, InterestRateAnalysis, InterestRateHikeSize, InterestRatePolicyDirection
+
+from app.logger import logger
+
+# ============ PATTERNS ===============
+
+# e.g. "to a range of 4.50% to 4.75%", "at 5.25% to 5.50%", "a range of 0% to 0.25%"
+RANGE_PATTERN = re.compile(r'(?:range of|at|to)\s+([\d.]+)\s*%\s*(?:to|-|–)\s*([\d.]+)\s*%', re.IGNORECASE)
+# e.g. "by 25 basis points", "by 75 bps"
+BASIS_POINTS_PATTERN = re.compile(r'by\s+(\d+)\s*(?:basis points?|bps?)\b', re.IGNORECASE)
+# e.g. "a quarter-point hike", "by half a percentage point"
+POINT_FRACTION_PATTERN = re.compile(r'\b(quarter|half)[- ](?:a[- ])?(?:percentage[- ])?point\b', re.IGNORECASE)
+POINT_FRACTIONS = {"quarter": 25, "half": 50}
 
-def extract_and_analyse(text):
+CHANGE_PATTERNS = {
+    ChangeType.increase: re.compile(r'\b(rais(?:ed|es|ing)|increas(?:ed|es|ing)|hik(?:e|ed|es|ing))\b', re.IGNORECASE),
+    ChangeType.decrease: re.compile(r'\b(lower(?:ed|s|ing)|cut(?:s|ting)?|reduc(?:ed|es|ing)|decreas(?:ed|es|ing))\b', re.IGNORECASE),
+    ChangeType.hold: re.compile(r'\b(maintain(?:ed|s|ing)|held|hold(?:s|ing)|kept|keep(?:s|ing)|left|leaves|unchanged)\b', re.IGNORECASE),
+}
+
+POLICY_DIRECTIONS = {
+    ChangeType.increase: InterestRatePolicyDirection.hawkish,
+    ChangeType.decrease: InterestRatePolicyDirection.dovish,
+    ChangeType.hold: InterestRatePolicyDirection.neutral,
+}
+
+
+def extract_and_analyse(text: str) -> InterestRateAnalysis:
     """
-        Combines the rules-based extraction and the LLM analysis.
+        Combines the rules-based classification and the LLM analysis:
+        the LLM is only asked about statements the rules can't parse.
     """
-    result = extract(text)
-    result = analyse(result)
+    result = classify(text)
+    if result is None:
+        result = analyse(text)
     return result
 
 def extract(text):
@@ -24,7 +55,7 @@ def extract(text):
     }
 
     # Extract new range (e.g., "to a range of 4.50% to 4.75%")
-    range_match = re.search(r'to a range of ([\d.]+)% to ([\d.]+)%', text)
+    range_match = RANGE_PATTERN.search(text)
     if range_match:
         lower = float(range_match.group(1))
         upper = float(range_match.group(2))
@@ -32,22 +63,70 @@ def extract(text):
         result["nominal_rate"] = round(midpoint, 3)
         result["new_range"] = (lower, upper)
 
-    # Extract basis point change (e.g., "raised by 25 basis points")
-    bp_match = re.search(r'by (\d+)\s*basis points', text, re.IGNORECASE)
+    # Extract basis point change (e.g., "raised by 25 basis points", "a quarter-point hike")
+    bp_match = BASIS_POINTS_PATTERN.search(text)
     if bp_match:
         result["basis_points_change"] = int(bp_match.group(1))
-    print(result)
+    else:
+        fraction_match = POINT_FRACTION_PATTERN.search(text)
+        if fraction_match:
+            result["basis_points_change"] = POINT_FRACTIONS[fraction_match.group(1).lower()]
     return result
 
-def analyse(text):
+def change_type(text: str) -> Optional[ChangeType]:
     """
-        Analyses further interest rate information from the given text.
-        Uses an LLM.
+        The direction of the decision, from its verb. None if no rule matches,
+        or if more than one does (e.g. "raised ... after holding").
     """
-    interest_rate_analyst = create_react_agent(
-        model=LLM,
-        tools=[],
-        prompt="""You are an Interest Rate Analyst. Next, you will be given a statement about how interest rates have changed this month, you need to PRECISELY extract the following financial indicators based on the interest rate, EXCLUSIVELY from the statement provided, and using your contextual expertise in financial markets. 
+    matches = [change for change, pattern in CHANGE_PATTERNS.items() if pattern.search(text)]
+    return matches[0] if len(matches) == 1 else None
+
+def hike_size(basis_points: int) -> InterestRateHikeSize:
+    """
+        0 bp is none, under 25 bp small, 25 to 49 bp moderate, 50 bp or more aggressive.
+    """
+    basis_points = abs(basis_points)
+    if basis_points == 0:
+        return InterestRateHikeSize.none
+    if basis_points < 25:
+        return InterestRateHikeSize.small
+    if basis_points < 50:
+        return InterestRateHikeSize.moderate
+    return InterestRateHikeSize.aggressive
+
+@lru_cache(maxsize=1024)
+def classify(text: str) -> Optional[InterestRateAnalysis]:
+    """
+        Deterministic InterestRateAnalysis of a Fed statement, or None when the rules
+        can't parse it (no target range, no clear direction, or a move without a size).
+        basis_points_change is signed: negative for a cut.
+    """
+    extracted = extract(text)
+    change = change_type(text)
+    if extracted["new_range"] is None or change is None:
+        return None
+
+    basis_points = extracted["basis_points_change"]
+    if change == ChangeType.hold:
+        basis_points = 0
+    elif basis_points is None:
+        return None
+    elif change == ChangeType.decrease:
+        basis_points = -basis_points
+
+    lower, upper = extracted["new_range"]
+    return InterestRateAnalysis(
+        nominal_rate=extracted["nominal_rate"],
+        new_range=[lower, upper],
+        basis_points_change=basis_points,
+        change_type=change,
+        policy_direction=POLICY_DIRECTIONS[change],
+        rate_hike_size=hike_size(basis_points),
+        range_given=True,
+        range_width=round(upper - lower, 3),
+    )
+
+INTEREST_RATE_PROMPT = """You are an Interest Rate Analyst. Next, you will be given a statement about how interest rates have changed this month, you need to PRECISELY extract the following financial indicators based on the interest rate, EXCLUSIVELY from the statement provided, and using your contextual expertise in financial markets.
         For exmaple 'The Federal Reserve raised the target for the federal funds rate by 25 basis points to a range of 4.50% to 4.75%'
         should return:
         {
@@ -71,13 +150,33 @@ def analyse(text):
         6. Rate hike size
         7. Range given
         8. Range width
-        """,
+        """
+
+@lru_cache(maxsize=1)
+def get_interest_rate_analyst():
+    """
+        Builds the Interest Rate Analyst agent once, on first use.
+    """
+    return create_react_agent(
+        model=get_llm(),
+        tools=[],
+        prompt=INTEREST_RATE_PROMPT,
         response_format=InterestRateAnalysis,
     )
-    return interest_rate_analyst.invoke(text)
+
+def _analyst_input(text: str) -> dict:
+    return {"messages": [HumanMessage(content=text)]}
+
+def analyse(text: str) -> InterestRateAnalysis:
+    """
+        Analyses further interest rate information from the given text.
+        Uses an LLM.
+    """
+    logger.info("🏦 INTEREST RATES | no rule matched, asking the LLM")
+    return get_interest_rate_analyst().invoke(_analyst_input(text))["structured_response"]
 
 if __name__=="__main__":
     # Example usage
     text = "The Federal Reserve raised the target for the federal funds rate by 25 basis points to a range of 3.50% to 3.75%"
     info = extract_and_analyse(text)
-    print(info['structured_response'])
+    print(info)
@@ -1,25 +1,171 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import httpx
 import requests
-from langchain.tools import tool
-from app.config import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from langchain_core.tools import StructuredTool
+from app import metrics
+from app.config import get_settings
+from app.rate_limiter import get_limiter
+from app.tools.singleflight import coalesce
+from app.utils import open_sqlite
 
 from app.logger import logger
 
-@tool
-def google(query: str) -> str:
+# ============ RESULT CACHE ===============
+
+class SearchCache:
+    """
+        Persistent TTL cache of raw Serper responses, keyed on the normalised query,
+        so near-identical searches from different agents in the same month are free.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS searches (query TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def normalise(query: str) -> str:
+        return " ".join(query.lower().split()).strip(" ?!.")
+
+    def get(self, query: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, fetched_at FROM searches WHERE query = ?", (self.normalise(query),)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            self.misses += 1
+            metrics.record_cache("search", hit=False)
+            return None
+        self.hits += 1
+        metrics.record_cache("search", hit=True)
+        return json.loads(row[0])
+
+    def put(self, query: str, results: dict):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                (self.normalise(query), json.dumps(results), time.time()),
+            )
+
+
+@lru_cache(maxsize=1)
+def get_search_cache() -> SearchCache:
+    settings = get_settings()
+    return SearchCache(
+        path=os.path.join(settings.cache_dir, "search.sqlite"),
+        ttl_seconds=settings.search_cache_ttl_hours * 3600,
+    )
+
+# ============ HTTP CLIENTS ===============
+
+def _headers() -> dict:
+    return {
+        "X-API-KEY": get_settings().serper_api_key,
+        "Content-Type": "application/json"
+    }
+
+@lru_cache(maxsize=1)
+def _session() -> requests.Session:
+    """
+        One pooled keep-alive session for every sync search in the process.
+    """
+    settings = get_settings()
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.serper_max_in_flight, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(_headers())
+    return session
+
+# an AsyncClient is bound to the event loop it first ran on, so keep one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def _async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        settings = get_settings()
+        client = httpx.AsyncClient(
+            headers=_headers(),
+            timeout=settings.search_timeout_seconds,
+            limits=httpx.Limits(max_connections=settings.serper_max_in_flight),
+        )
+        _async_clients[loop] = client
+    return client
+
+# ============ FORMATTING ===============
+
+def _top_results(results: dict, k: int) -> str:
+    organic = results.get("organic") or []
+    if not organic:
+        return "No results found."
+
+    lines = []
+    for rank, result in enumerate(organic[:k], start=1):
+        title = result.get("title", "")
+        snippet = result.get("snippet", "No snippet found.")
+        link = result.get("link", "")
+        lines.append(f"{rank}. {title}: {snippet} ({link})")
+    return "\n".join(lines)
+
+# ============ TOOL ===============
+
+def _google(query: str) -> str:
     """
     Perform a Google search to find relevant information.
+    Returns the top organic results, each with its title, snippet and link.
     """
     logger.info("🔨SEARCHER tool | was invoked")
     logger.info(query)
-    headers = {
-        "X-API-KEY": settings.serper_api_key,
-        "Content-Type": "application/json"
-    }
-    payload = {"q": query}
-    response = requests.post("https://google.serper.dev/search", json=payload, headers=headers)
-    results = response.json()
-
-    if "organic" in results and results["organic"]:
-        return results["organic"][0].get("snippet", "No snippet found.")
-    
-    return "No results found."
+    settings = get_settings()
+    cache = get_search_cache()
+    results = cache.get(query)
+    if results is None:
+        payload = {"q": query}
+        with get_limiter("serper").limit():
+            response = _session().post(settings.serper_url, json=payload, timeout=settings.search_timeout_seconds)
+        # urllib3 retries inside the adapter; its history is the only record of them
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            metrics.record_retry("serper", len(retries.history))
+        response.raise_for_status()
+        results = response.json()
+        cache.put(query, results)
+    return _top_results(results, settings.search_top_k)
+
+async def _agoogle(query: str) -> str:
+    logger.info("🔨SEARCHER tool | was invoked")
+    logger.info(query)
+    settings = get_settings()
+    cache = get_search_cache()
+    results = cache.get(query)
+    if results is None:
+        payload = {"q": query}
+        async with get_limiter("serper").alimit():
+            response = await _async_client().post(settings.serper_url, json=payload)
+        response.raise_for_status()
+        results = response.json()
+        cache.put(query, results)
+    return _top_results(results, settings.search_top_k)
+
+# sync and async implementations, so searches overlap under ainvoke;
+# the same query already in flight from another agent shares its request
+google = coalesce(
+    StructuredTool.from_function(func=_google, coroutine=_agoogle, name="google", callbacks=[metrics.tool_callback]),
+    normalise=lambda value: SearchCache.normalise(value) if isinstance(value, str) else value,
+)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from langchain_core.tools import StructuredTool
+
+from app.logger import logger
+
+
+def _default_normalise(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+class SingleFlight:
+    """
+        Coalesces identical calls that are in flight at the same time: the first caller
+        runs the work, later callers with the same key wait for and share its result
+        (or exception). Nothing is cached once the call completes.
+
+        Every flight is a concurrent.futures.Future, so threads and coroutines on any
+        event loop can join the same call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: dict = {}
+        self._counters = defaultdict(lambda: {"calls": 0, "coalesced": 0})
+
+    def _join(self, name: str, key) -> tuple:
+        with self._lock:
+            self._counters[name]["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._counters[name]["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def _land(self, key, future: Future, result=None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, name: str, key, fn: Callable):
+        future, leader = self._join(name, key)
+        if not leader:
+            logger.debug(f"🛬 SINGLE FLIGHT | {name} | joined an in-flight call")
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, result=result)
+        return result
+
+    async def ado(self, name: str, key, coroutine_fn: Callable):
+        future, leader = self._join(name, key)
+        if not leader:
+            logger.debug(f"🛬 SINGLE FLIGHT | {name} | joined an in-flight call")
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coroutine_fn()
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, result=result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counters.items()}
+
+
+# one process-wide group, so the Analyst, Quant, CIO and Risk branches share flights
+tool_calls = SingleFlight()
+
+
+def coalesce(tool: StructuredTool, normalise: Callable = _default_normalise, group: SingleFlight = tool_calls) -> StructuredTool:
+    """
+        Wraps a LangChain tool so identical calls already in flight share one result.
+        Arguments are passed through `normalise` before keying, e.g. to fold query case.
+    """
+    def key(kwargs: dict) -> tuple:
+        normalised = {name: normalise(value) for name, value in kwargs.items()}
+        return tool.name, json.dumps(normalised, sort_keys=True, default=str)
+
+    def func(**kwargs):
+        return group.do(tool.name, key(kwargs), lambda: tool.func(**kwargs))
+
+    async def coroutine(**kwargs):
+        if tool.coroutine is None:
+            return await group.ado(tool.name, key(kwargs), lambda: asyncio.to_thread(tool.func, **kwargs))
+        return await group.ado(tool.name, key(kwargs), lambda: tool.coroutine(**kwargs))
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=func,
+        coroutine=coroutine,
+        callbacks=tool.callbacks,
+    )
@@ -1,13 +1,22 @@
-import yfinance as yf
+import asyncio
 import pandas as pd
 
-from langchain_core.tools import tool
-from functools import lru_cache
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+from app import metrics
+from app.price_store import get_price_store
+from app.tools.singleflight import coalesce
+from app.utils import month_bounds
 from app.logger import logger
 
-@tool
-def fetch_and_summarise_ticker(symbol: str, year: int = 2023, month: int = 1) -> dict:
+# Summary fields in the order the groupby aggregations produce them
+SUMMARY_FIELDS = ["month_end_value", "monthly_average", "high", "low", "volatility_stdev"]
+SUMMARY_AGGREGATIONS = ["last", "mean", "max", "min", "std"]
+SUMMARY_ROUNDING = {"month_end_value": 4, "monthly_average": 4, "high": 4, "low": 4, "volatility_stdev": 6}
+
+# (symbol, month) summaries precomputed for the current run, see precompute_summaries
+_summary_table = None
+
+def _fetch_and_summarise_ticker(symbol: str, year: int = 2023, month: int = 1) -> str:
     """
     Fetches and summarises the ticker data for a given month from Yahoo Finance API.
 
@@ -17,22 +26,38 @@ def fetch_and_summarise_ticker(symbol: str, year: int = 2023, month: int = 1) ->
         month (int): The month (1-12).
 
     Returns:
-        dict: An LLM summary of the ticker data.
+        str: An LLM summary of the ticker data.
     """
     logger.info("🔨 YFINANCE tool | was invoked")
     logger.info(f"symbol: {symbol}, year: {year}, month: {month}")
 
-    prices = fetch_monthly_ticker(symbol, year, month)
-    summary = summarise_ticker(prices)
+    summary = monthly_summary(symbol, year, month)
     llm_summary = format_summary_for_llm(summary, symbol, year, month)
     
     logger.info("🔨 YFINANCE tool | result was fetched")
     logger.info(llm_summary)
     return llm_summary
 
+async def _afetch_and_summarise_ticker(symbol: str, year: int = 2023, month: int = 1) -> str:
+    # yfinance and the price store are blocking, keep them off the event loop
+    return await asyncio.to_thread(_fetch_and_summarise_ticker, symbol, year, month)
+
+# identical lookups already in flight (e.g. SPY from the Analyst and the Quant) share one fetch
+fetch_and_summarise_ticker = coalesce(
+    StructuredTool.from_function(
+        func=_fetch_and_summarise_ticker,
+        coroutine=_afetch_and_summarise_ticker,
+        name="fetch_and_summarise_ticker",
+        parse_docstring=True,
+        callbacks=[metrics.tool_callback],
+    ),
+    normalise=lambda value: value.strip().upper() if isinstance(value, str) else value,
+)
+
 def fetch_monthly_ticker(symbol: str, year: int, month: int) -> pd.DataFrame:
     """
     Fetch daily price data for a given ticker symbol for a specific month.
+    Reads through the local price store, so a month is only downloaded once.
     
     Args:
         symbol (str): The stock ticker symbol (e.g., "SPY" or "^IRX").
@@ -43,21 +68,9 @@ def fetch_monthly_ticker(symbol: str, year: int, month: int) -> pd.DataFrame:
         pd.DataFrame: DataFrame with daily OHLCV data for that month.
     """
     # Compute start and end date for the given month
-    start_date = pd.Timestamp(year=year, month=month, day=1)
-    if month == 12:
-        end_date = pd.Timestamp(year=year + 1, month=1, day=1)
-    else:
-        end_date = pd.Timestamp(year=year, month=month + 1, day=1)
-
-    # Download data with daily interval
-    df = yf.download(
-        symbol,
-        start=start_date.strftime('%Y-%m-%d'),
-        end=end_date.strftime('%Y-%m-%d'),
-        interval="5d",
-        progress=False,
-        auto_adjust=True,
-    )
+    start_date, end_date = month_bounds(year, month)
+
+    df = get_price_store().get(symbol, start_date, end_date, interval="1d")
 
     if df.empty:
         raise ValueError(f"No data returned for {symbol} in {year}-{month:02d}")
@@ -79,11 +92,11 @@ def summarise_ticker(
     Returns:
         dict: Summary stats.
     """
-    month_end = df[column].iloc[-1]
-    month_avg = df[column].mean()
-    month_high = df[column].max()
-    month_low = df[column].min()
-    month_vol = df[column].std()
+    month_end = float(df[column].iloc[-1])
+    month_avg = float(df[column].mean())
+    month_high = float(df[column].max())
+    month_low = float(df[column].min())
+    month_vol = float(df[column].std())
 
     summary = {
         "month_end_value": round(month_end, 4),
@@ -95,12 +108,54 @@ def summarise_ticker(
 
     return summary
 
+def summarise_panel(panel: pd.DataFrame, column: str = "Close") -> pd.DataFrame:
+    """
+    Vectorised summary of a long price table, for every (symbol, month) at once.
+
+    Args:
+        panel (pd.DataFrame): Prices indexed by (symbol, Date), e.g. from PriceStore.load_panel.
+        column (str): Which column to summarise (default: 'Close').
+
+    Returns:
+        pd.DataFrame: One row per (symbol, month period) with the summary fields as columns.
+    """
+    values = panel[column]
+    symbols = values.index.get_level_values("symbol")
+    months = values.index.get_level_values("Date").to_period("M")
+
+    table = values.groupby([symbols, months], sort=True).agg(SUMMARY_AGGREGATIONS)
+    table.columns = SUMMARY_FIELDS
+    table.index.names = ["symbol", "month"]
+    return table.round(SUMMARY_ROUNDING)
+
+def precompute_summaries(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarises a whole run's panel up front, so monthly lookups are a table read.
+    Months already summarised are kept, for runs in the same process over other months.
+    """
+    global _summary_table
+    table = summarise_panel(panel)
+    _summary_table = table if _summary_table is None else table.combine_first(_summary_table)
+    return _summary_table
+
+def monthly_summary(symbol: str, year: int, month: int) -> dict:
+    """
+    Summary stats for one symbol and month: read from the precomputed table when
+    the run has one, otherwise fetched and summarised on the spot.
+    """
+    key = (symbol, pd.Period(year=year, month=month, freq="M"))
+    # read once: a run starting in another thread may replace the table meanwhile
+    table = _summary_table
+    if table is not None and key in table.index:
+        return table.loc[key].to_dict()
+    return summarise_ticker(fetch_monthly_ticker(symbol, year, month))
+
 def format_summary_for_llm(summary_dict, ticker_name, year, month):
     """
     Formats the financial summary for LLM ingestion.
 
     Parameters:
-    - summary_dict (dict): A dictionary containing the financial summary with keys:
+    - summary_dict (dict): A dictionary (or summary table row) containing the financial summary with keys:
       'month_end_value', 'monthly_average', 'high', 'low', 'volatility_stdev'.
     - ticker_name (str): The name of the ticker.
     - year (int): The year of the data.
@@ -109,11 +164,11 @@ def format_summary_for_llm(summary_dict, ticker_name, year, month):
     Returns:
     - str: A formatted string summarizing the financial data.
     """
-    month_end_value = summary_dict['month_end_value'].iloc[0]
-    monthly_average = summary_dict['monthly_average'].iloc[0]
-    high = summary_dict['high'].iloc[0]
-    low = summary_dict['low'].iloc[0]
-    volatility_stdev = summary_dict['volatility_stdev'].iloc[0]
+    month_end_value = summary_dict['month_end_value']
+    monthly_average = summary_dict['monthly_average']
+    high = summary_dict['high']
+    low = summary_dict['low']
+    volatility_stdev = summary_dict['volatility_stdev']
 
     return (f"Summary of {ticker_name} for {pd.Timestamp(year=year, month=month, day=1).strftime('%B %Y')}:\n"
             f"- Month-End Value: {month_end_value:.2f}\n"
@@ -128,4 +183,4 @@ if __name__ == "__main__":
     symbol = "^IRX"
     year = 2024
     month = 6
-    print(fetch_and_summarise_ticker(symbol, year, month))
+    print(fetch_and_summarise_ticker.invoke({"symbol": symbol, "year": year, "month": month}))
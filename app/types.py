@@ -103,6 +103,10 @@ class SharedState(TypedDict, total=False):
     
     analyst_report: Report
     quant_report: Report
+    # what each researcher looked at (tool results, indicator summaries), handed to
+    # them again when the CIO questions their report
+    analyst_evidence: list[str]
+    quant_evidence: list[str]
     risk_report: RiskReport
     CIO_report: Report
 
@@ -1,10 +1,33 @@
-from datetime import datetime
+import os
+import sqlite3
+from datetime import date, datetime
 
 def convert_date(date_string: str) -> tuple:
     # Assuming date_string is in the format 'Month Year'
     date_object = datetime.strptime(date_string, '%B %Y')
     return date_object.year, date_object.month
 
+def month_bounds(year: int, month: int) -> tuple:
+    """
+        Returns the [start, end) dates of a calendar month.
+    """
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def open_sqlite(path: str) -> sqlite3.Connection:
+    """
+        Opens (and creates if needed) a SQLite database for the local caches.
+        WAL mode lets several processes read while one writes.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 if __name__ == "__main__":
     year, month = convert_date("March 2023")
     print(f"year = {year}, month = {month}")
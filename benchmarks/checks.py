@@ -0,0 +1,114 @@
+"""
+    Behaviour checks that run offline, on the benchmark fakes.
+
+    Each check sets up what it needs in a temporary CACHE_DIR and prints one ✅ or ❌
+    line. They guard properties the benchmarks cannot see, e.g. that a repeated agent
+    run is served from the LLM cache (the benchmarks run with LLM_CACHE=false).
+
+    Usage: python -m benchmarks.checks [--only NAME]
+    Exits non-zero when a check fails.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import warnings
+
+CHECKS = {}
+
+
+def check(func):
+    CHECKS[func.__name__] = func
+    return func
+
+
+def _configure_env(cache_dir: str):
+    """
+        Settings for an isolated, offline run. Must happen before the app is imported.
+    """
+    from langchain_core._api import LangChainBetaWarning
+
+    os.environ.setdefault("OPENAI_API_KEY", "checks")
+    os.environ.setdefault("SERPER_API_KEY", "checks")
+    os.environ["CACHE_DIR"] = cache_dir
+    os.environ["LLM_CACHE"] = "true"
+    os.environ["LLM_REPLAY"] = "false"
+    os.environ["LOG_CONSOLE"] = "off"
+    warnings.filterwarnings("ignore", category=UserWarning, module="langchain_openai")
+    # the cache deserialises responses with langchain's (beta) loads
+    warnings.filterwarnings("ignore", category=LangChainBetaWarning)
+
+
+@check
+def llm_cache_hits_repeated_agent_run() -> str:
+    """
+        The same ReAct agent run twice: the second run makes no provider call.
+    """
+    from langchain_core.messages import HumanMessage
+
+    from benchmarks import fakes
+    from app.config import get_llm_cache
+    from app.agents.risk_agent import get_risk_agent
+
+    served = fakes.install_llm(fakes.LLMProfile())
+    fakes.install_search(fakes.SearchProfile())
+    messages = {"messages": [HumanMessage(content="Month: May 2015\nThe new split is 0.5 to equities and 0.5 to bonds.")]}
+
+    get_risk_agent().invoke(messages)
+    first = served["calls"]
+    get_risk_agent().invoke(messages)
+    repeated = served["calls"] - first
+    assert first > 0 and repeated == 0, f"the repeated run made {repeated} provider calls (first run: {first})"
+    return f"repeated agent run served from the cache ({get_llm_cache().stats()['hits']} hits)"
+
+
+@check
+def risk_prescreen_boundaries() -> str:
+    """
+        A move exactly on RISK_PASS_MAX_SHIFT is a Pass and one exactly on
+        RISK_BLOCK_MIN_SHIFT is a Block, despite float noise in the difference.
+    """
+    from app.agents.risk_agent import prescreen
+    from app.config import get_settings
+    from app.types import Report, RiskVerdict
+
+    settings = get_settings()
+    cases = [
+        (0.6, 0.6 + settings.risk_pass_max_shift, RiskVerdict.pass_),
+        (0.6, 0.6 - settings.risk_pass_max_shift, RiskVerdict.pass_),
+        (0.4, 0.4 + settings.risk_block_min_shift, RiskVerdict.block),
+        (0.7, 0.7 - settings.risk_block_min_shift, RiskVerdict.block),
+        (0.5, 0.65, None),
+    ]
+    for previous, equities, expected in cases:
+        equities = round(equities, 2)
+        report = prescreen({
+            "CIO_report": Report(equities=equities, bonds=round(1 - equities, 2), justification="."),
+            "prev_equity_allocation": previous,
+        })
+        verdict = report.verdict if report else None
+        assert verdict == expected, f"{previous} -> {equities} gave {verdict}, expected {expected}"
+    return f"{len(cases)} moves on and between the thresholds"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", choices=sorted(CHECKS))
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        _configure_env(os.path.join(directory, "cache"))
+        for name, func in CHECKS.items():
+            if args.only and name != args.only:
+                continue
+            try:
+                print(f"✅ {name}: {func()}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
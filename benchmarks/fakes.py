@@ -0,0 +1,231 @@
+"""
+    Deterministic local stand-ins for OpenAI, Serper and Yahoo Finance.
+
+    They replace the provider calls only: the OpenAI request behind config.LLM, the
+    HTTP session behind searcher.google, and the yfinance download behind the price
+    store (and so fetch_monthly_ticker). Everything in between (rate limiters, caches,
+    checkpoints, metrics) still runs, so the benchmarks measure the app's own overhead
+    plus whatever provider latency the profile asks for.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+MONTH_PATTERN = re.compile(r"\b(January|February|March|April|May|June|July|August|September|October|November|December) (\d{4})\b")
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+
+
+@dataclass
+class LLMProfile:
+    """
+        How the fake model behaves: a fixed latency per call plus a per-token one,
+        the completion size, how often the risk agent warns, and how many tool calls
+        an agent makes before answering (each offered tool once, up to that many).
+    """
+    latency_ms: float = 0.0
+    ms_per_token: float = 0.0
+    completion_tokens: int = 60
+    warn_rate: float = 0.0
+    tool_calls: int = 3
+
+
+@dataclass
+class SearchProfile:
+    latency_ms: float = 0.0
+    results: int = 5
+
+
+def _seed(*parts) -> int:
+    return int.from_bytes(hashlib.sha256(repr(parts).encode("utf-8")).digest()[:8], "big")
+
+def _text(messages) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+# ============ LLM ===============
+
+def _tool_args(name: str, properties: dict, text: str, profile: LLMProfile) -> dict:
+    """
+        Plausible arguments for a tool or structured-output schema.
+    """
+    if name == "google":
+        return {"query": f"market outlook {_month_label(text)}"}
+    if name == "fetch_and_summarise_ticker":
+        month, year = _month(text)
+        return {"symbol": "SPY", "year": year, "month": month}
+    if name.startswith("question_"):
+        return {"question": "What drives your allocation this month?"}
+
+    rng = np.random.default_rng(_seed(name, text))
+    equities = round(float(rng.uniform(0.3, 0.8)), 2)
+    args = {}
+    for field, schema in properties.items():
+        if field == "equities":
+            args[field] = equities
+        elif field == "bonds":
+            args[field] = round(1 - equities, 2)
+        elif field == "verdict":
+            args[field] = "Warn" if rng.random() < profile.warn_rate else "Pass"
+        elif schema.get("type") in ("number", "integer"):
+            args[field] = 0
+        else:
+            args[field] = "Synthetic justification. " * 4
+    return args
+
+def _month_label(text: str) -> str:
+    match = MONTH_PATTERN.search(text)
+    return match.group(0) if match else "January 2015"
+
+def _month(text: str) -> tuple:
+    match = MONTH_PATTERN.search(text)
+    if not match:
+        return 1, 2015
+    return MONTHS.index(match.group(1)) + 1, int(match.group(2))
+
+def fake_response(messages, kwargs: dict, profile: LLMProfile):
+    """
+        The fake model's answer: a structured-output tool call when one is forced;
+        otherwise, on an agent's turns, a call of the next tool offered (round-robin,
+        each tool once, up to profile.tool_calls), then plain text.
+        Returns (message, completion_tokens).
+    """
+    from langchain_core.messages import AIMessage
+
+    tools = kwargs.get("tools") or []
+    text = _text(messages)
+    made = sum(len(getattr(message, "tool_calls", None) or []) for message in messages if isinstance(message, AIMessage))
+    if tools and (kwargs.get("tool_choice") or made < min(len(tools), profile.tool_calls)):
+        function = tools[0 if kwargs.get("tool_choice") else made % len(tools)]["function"]
+        args = _tool_args(function["name"], function.get("parameters", {}).get("properties", {}), text, profile)
+        # a stable id, so identical conversations produce identical tool calls and results
+        call_id = f"call_{_seed(function['name'], text) % 10**12}"
+        message = AIMessage(content="", tool_calls=[{"name": function["name"], "args": args, "id": call_id}])
+        return message, len(json.dumps(args)) // 4
+    content = " ".join(["synthetic"] * profile.completion_tokens)
+    return AIMessage(content=content), profile.completion_tokens
+
+def install_llm(profile: LLMProfile) -> dict:
+    """
+        Replaces the OpenAI request made by every ChatOpenAI (and so by config.LLM)
+        with the fake. Returns a dict counting the calls it served.
+    """
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_openai import ChatOpenAI
+
+    from app.tokens import count_message_tokens
+
+    served = {"calls": 0}
+
+    def result(messages, kwargs):
+        served["calls"] += 1
+        message, completion_tokens = fake_response(messages, kwargs, profile)
+        usage = {"prompt_tokens": count_message_tokens(messages), "completion_tokens": completion_tokens}
+        delay = (profile.latency_ms + profile.ms_per_token * completion_tokens) / 1000
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage}), delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        chat_result, delay = result(messages, kwargs)
+        if delay:
+            time.sleep(delay)
+        return chat_result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        chat_result, delay = result(messages, kwargs)
+        if delay:
+            await asyncio.sleep(delay)
+        return chat_result
+
+    ChatOpenAI._generate = _generate
+    ChatOpenAI._agenerate = _agenerate
+    return served
+
+# ============ SEARCH ===============
+
+class _Response:
+    def __init__(self, payload: dict):
+        self._payload = payload
+        self.raw = None
+
+    def json(self) -> dict:
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+def _search_results(query: str, profile: SearchProfile) -> dict:
+    return {"organic": [
+        {"title": f"Result {rank} for {query}", "snippet": f"Synthetic snippet {rank} about {query}.", "link": f"https://example.com/{rank}"}
+        for rank in range(profile.results)
+    ]}
+
+
+class FakeSession:
+    def __init__(self, profile: SearchProfile, served: dict):
+        self.profile = profile
+        self.served = served
+
+    def post(self, url, json=None, timeout=None):
+        self.served["calls"] += 1
+        if self.profile.latency_ms:
+            time.sleep(self.profile.latency_ms / 1000)
+        return _Response(_search_results(json["q"], self.profile))
+
+
+class FakeAsyncClient(FakeSession):
+    async def post(self, url, json=None, timeout=None):
+        self.served["calls"] += 1
+        if self.profile.latency_ms:
+            await asyncio.sleep(self.profile.latency_ms / 1000)
+        return _Response(_search_results(json["q"], self.profile))
+
+
+def install_search(profile: SearchProfile) -> dict:
+    """
+        Points searcher.google's sync and async HTTP clients at the fake.
+    """
+    from app.tools import searcher
+
+    served = {"calls": 0}
+    searcher._session = lambda: FakeSession(profile, served)
+    searcher._async_client = lambda: FakeAsyncClient(profile, served)
+    return served
+
+# ============ PRICES ===============
+
+def fake_download(tickers, start=None, end=None, interval="1d", **kwargs) -> pd.DataFrame:
+    """
+        A yf.download-shaped frame of business-day random walks, the same for the same
+        symbol and dates on every run.
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+    columns = pd.MultiIndex.from_product([["Close", "High", "Low", "Open", "Volume"], tickers], names=["Price", "Ticker"])
+    data = np.empty((len(dates), len(columns)))
+    for position, ticker in enumerate(tickers):
+        rng = np.random.default_rng(_seed(ticker, str(start)))
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, len(dates))))
+        for field_position, spread in enumerate((0.0, 0.005, -0.005, 0.001)):
+            data[:, field_position * len(tickers) + position] = close * (1 + spread)
+        data[:, 4 * len(tickers) + position] = 1_000_000
+    return pd.DataFrame(data, index=dates, columns=columns)
+
+def install_prices() -> dict:
+    """
+        Replaces yfinance's download, which the price store calls on a miss.
+    """
+    import yfinance
+
+    served = {"calls": 0}
+
+    def download(*args, **kwargs):
+        served["calls"] += 1
+        return fake_download(*args, **kwargs)
+
+    yfinance.download = download
+    return served
@@ -0,0 +1,74 @@
+"""
+    Import-time budget for the app package.
+
+    Importing app.main must not load data, build agents or read credentials, so a
+    cold `import app.main` stays in the tens of milliseconds. Measured with
+    `python -X importtime` in a fresh interpreter, without API keys in the env.
+
+    Usage: python -m benchmarks.import_time [--budget-ms 100] [--module app.main]
+    Exits non-zero when the budget is exceeded or the import fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 100
+# imports that must succeed without OPENAI_API_KEY / SERPER_API_KEY
+CREDENTIAL_FREE_MODULES = ["app.main", "app.agents.CIO_agent", "app.agents.risk_agent"]
+
+
+def _clean_env() -> dict:
+    env = {key: value for key, value in os.environ.items() if key not in ("OPENAI_API_KEY", "SERPER_API_KEY")}
+    env["PYTHONPATH"] = REPO_ROOT
+    return env
+
+
+def import_time_ms(module: str, runs: int = 3) -> float:
+    """
+        Best-of-`runs` cumulative import time of `module`, in milliseconds.
+    """
+    best = float("inf")
+    # run outside the repo, so a developer's .env doesn't mask an eager Settings()
+    with tempfile.TemporaryDirectory() as cwd:
+        os.mkdir(os.path.join(cwd, "logs"))
+        results = [
+            subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                capture_output=True, text=True, env=_clean_env(), cwd=cwd,
+            )
+            for _ in range(runs)
+        ]
+    for result in results:
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                best = min(best, int(parts[1]) / 1000)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--module", default="app.main")
+    args = parser.parse_args()
+
+    for module in CREDENTIAL_FREE_MODULES:
+        import_time_ms(module, runs=1)
+        print(f"✅ {module} imports without credentials")
+
+    elapsed = import_time_ms(args.module)
+    if elapsed > args.budget_ms:
+        print(f"❌ import {args.module}: {elapsed:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        return 1
+    print(f"✅ import {args.module}: {elapsed:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
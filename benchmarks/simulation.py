@@ -0,0 +1,234 @@
+"""
+    Offline simulation benchmark.
+
+    Runs run_simulation (or its async / pipelined variants) over synthetic multi-year
+    market data, with OpenAI, Serper and Yahoo Finance replaced by the deterministic
+    fakes in benchmarks.fakes, and reports throughput (months/sec), p50/p95 wall time
+    per graph node and peak RSS. Nothing leaves the machine and nothing is billed.
+
+    The result is compared against the scenario's entry in benchmarks/baseline.json:
+    throughput may not drop, nor p95 node time or peak RSS grow, by more than the
+    tolerances below. Baselines are machine-specific; re-record them on the machine
+    that runs the comparison with --update-baseline.
+
+    Usage: python -m benchmarks.simulation [--years 3] [--mode sync|async|pipelined]
+           [--llm-latency-ms 0] [--ms-per-token 0] [--search-latency-ms 0]
+           [--quant-mode llm|rules] [--keep-rate-limits] [--update-baseline] [--no-compare]
+    Exits non-zero when the run regresses past a threshold.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+# Allowed regression against the baseline, as a fraction of the baseline value
+THROUGHPUT_TOLERANCE = 0.25
+P95_TOLERANCE = 0.5
+RSS_TOLERANCE = 0.2
+# p95 differences below this are timer noise, whatever the ratio
+P95_NOISE_FLOOR_MS = 20.0
+
+
+def _configure_env(cache_dir: str, console: str, mode: str, keep_rate_limits: bool, quant_mode: str = "llm"):
+    """
+        Settings for an isolated, offline run. Must happen before the app is imported.
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("SERPER_API_KEY", "benchmark")
+    os.environ["CACHE_DIR"] = cache_dir
+    # every run pays for its calls; a warm response cache would measure nothing
+    os.environ["LLM_CACHE"] = "false"
+    os.environ["LLM_REPLAY"] = "false"
+    os.environ["PRICES_OFFLINE"] = "false"
+    os.environ["APPROVAL_MODE"] = "queue"
+    os.environ["QUANT_MODE"] = quant_mode
+    if not keep_rate_limits:
+        # the fakes have no quota; with the real limits a long run measures the limiter
+        for limit in ("OPENAI_REQUESTS_PER_MINUTE", "OPENAI_TOKENS_PER_MINUTE", "SERPER_REQUESTS_PER_MINUTE"):
+            os.environ[limit] = str(10**9)
+    if mode == "pipelined":
+        # its decision chain is not checkpointed, so a Warn has no queue to wait in and
+        # would ask at the console; approve them unattended instead
+        os.environ["AUTO_APPROVE_WARN_MAX_SHIFT"] = "1.01"
+    os.environ["LOG_CONSOLE"] = console
+    # langchain warns that gpt-3.5 falls back to function calling on every structured call
+    warnings.filterwarnings("ignore", category=UserWarning, module="langchain_openai")
+
+def _use_market_data(directory: str, years: int):
+    from app import loader
+    from benchmarks import synthetic
+
+    source = synthetic.write(directory, years)
+    store = loader.MarketDataStore(path=os.path.join(directory, "market_data.jsonl"), source=source)
+    loader.get_market_data_store = lambda: store
+    return store
+
+def _warm_up():
+    """
+        Builds the graphs and agents (imports included) before the clock starts.
+    """
+    from app import main
+    from app.agents.CIO_agent import get_CIO_agent
+    from app.agents.analyst_agent import get_analyst_agent
+    from app.agents.quant_agent import get_quant_agent
+    from app.agents.risk_agent import get_risk_agent
+
+    for factory in (get_analyst_agent, get_quant_agent, get_CIO_agent, get_risk_agent):
+        factory()
+    main.get_graph()
+    main.get_graph(checkpointed=True)
+    main.get_graph(research=False)
+
+def _percentiles(samples: list) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 3),
+    }
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        _configure_env(os.path.join(directory, "cache"), args.console, args.mode, args.keep_rate_limits, args.quant_mode)
+
+        from benchmarks import fakes
+
+        llm_calls = fakes.install_llm(fakes.LLMProfile(
+            latency_ms=args.llm_latency_ms,
+            ms_per_token=args.ms_per_token,
+            completion_tokens=args.completion_tokens,
+            warn_rate=args.warn_rate,
+        ))
+        search_calls = fakes.install_search(fakes.SearchProfile(latency_ms=args.search_latency_ms))
+        price_calls = fakes.install_prices()
+        store = _use_market_data(directory, args.years)
+        _warm_up()
+
+        from app import main
+
+        started = time.perf_counter()
+        if args.mode == "async":
+            import asyncio
+            result = asyncio.run(main.arun_simulation())
+        else:
+            result = main.run_simulation(pipelined=args.mode == "pipelined", max_workers=args.max_workers)
+        seconds = time.perf_counter() - started
+        store.close()
+
+    months = len(result["allocations"])
+    node_seconds = {}
+    for month in result["metrics"]["months"]:
+        for node, scope in month["nodes"].items():
+            if scope["calls"]:
+                node_seconds.setdefault(node, []).append(scope["seconds"])
+    totals = result["metrics"]["totals"]
+    return {
+        "scenario": scenario_name(args),
+        "months": months,
+        "seconds": round(seconds, 3),
+        "months_per_sec": round(months / seconds, 3),
+        "nodes": {node: _percentiles(samples) for node, samples in sorted(node_seconds.items())},
+        "llm_round_trips": totals["llm_round_trips"],
+        "llm_calls_avoided": totals["llm_calls_avoided"],
+        "prompt_tokens_saved": totals["prompt_tokens_saved"],
+        "tokens": totals["prompt_tokens"] + totals["completion_tokens"],
+        "provider_calls": {"llm": llm_calls["calls"], "search": search_calls["calls"], "prices": price_calls["calls"]},
+        "final_capital": round(result["final_state"]["capital"], 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def scenario_name(args) -> str:
+    name = f"{args.mode}-{args.years}y-llm{args.llm_latency_ms:g}ms"
+    if args.ms_per_token:
+        name += f"+{args.ms_per_token:g}ms/token"
+    if args.search_latency_ms:
+        name += f"-search{args.search_latency_ms:g}ms"
+    if args.quant_mode != "llm":
+        name += f"-{args.quant_mode}-quant"
+    if args.keep_rate_limits:
+        name += "-limited"
+    return name
+
+def compare(report: dict, baseline: dict) -> list:
+    """
+        The regressions of `report` against `baseline`, as messages (empty if none).
+    """
+    failures = []
+    floor = baseline["months_per_sec"] * (1 - THROUGHPUT_TOLERANCE)
+    if report["months_per_sec"] < floor:
+        failures.append(f"throughput {report['months_per_sec']} months/s is below {floor:.3f} (baseline {baseline['months_per_sec']})")
+    for node, stats in report["nodes"].items():
+        if node not in baseline["nodes"]:
+            continue
+        base = baseline["nodes"][node]["p95_ms"]
+        if stats["p95_ms"] > base * (1 + P95_TOLERANCE) and stats["p95_ms"] - base > P95_NOISE_FLOOR_MS:
+            failures.append(f"{node} p95 {stats['p95_ms']} ms is over {base * (1 + P95_TOLERANCE):.3f} ms (baseline {base})")
+    ceiling = baseline["peak_rss_mb"] * (1 + RSS_TOLERANCE)
+    if report["peak_rss_mb"] > ceiling:
+        failures.append(f"peak RSS {report['peak_rss_mb']} MB is over {ceiling:.1f} MB (baseline {baseline['peak_rss_mb']})")
+    return failures
+
+def _load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--mode", choices=["sync", "async", "pipelined"], default="sync")
+    parser.add_argument("--max-workers", type=int, default=4, help="research threads in pipelined mode")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--warn-rate", type=float, default=0.0, help="share of months the risk agent warns")
+    parser.add_argument("--search-latency-ms", type=float, default=0.0)
+    parser.add_argument("--quant-mode", choices=["llm", "rules"], default="llm", help="QUANT_MODE for the run")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="throttle the fakes at the configured provider limits")
+    parser.add_argument("--console", choices=["rich", "plain", "off"], default="off")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--no-compare", action="store_true")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+
+    baselines = _load_baselines(args.baseline)
+    if args.update_baseline:
+        baselines[report["scenario"]] = report
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✅ baseline for {report['scenario']} written to {args.baseline}")
+        return 0
+    if args.no_compare:
+        return 0
+    if report["scenario"] not in baselines:
+        print(f"⚠️ no baseline for {report['scenario']}, record one with --update-baseline")
+        return 0
+
+    failures = compare(report, baselines[report["scenario"]])
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ {report['scenario']}: within the baseline thresholds")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+    Synthetic market_data, shaped like app/data/market_data.json, for any number of
+    years: a news summary and headlines per month, and CPI, unemployment and a Fed
+    decision that moves the target range up, down or not at all.
+"""
+import json
+import os
+
+import numpy as np
+
+from benchmarks.fakes import MONTHS
+
+COMPANIES = ["Apple", "Microsoft", "Nvidia", "JPMorgan", "Exxon", "Tesla", "Amazon", "Pfizer"]
+THEMES = ["inflation", "the labour market", "earnings", "the Fed", "energy prices", "bank stress", "AI spending"]
+
+
+def fed_decision(lower: float, change_bp: int) -> str:
+    new_lower = lower + change_bp / 100
+    new_range = f"a range of {new_lower:.2f}% to {new_lower + 0.25:.2f}%"
+    if change_bp > 0:
+        return f"The Federal Reserve raised the target for the federal funds rate by {change_bp} basis points to {new_range}."
+    if change_bp < 0:
+        return f"The Federal Reserve cut the target for the federal funds rate by {-change_bp} basis points to {new_range}."
+    return f"The Federal Reserve held the target for the federal funds rate steady at {new_range}."
+
+def generate(years: int = 3, start_year: int = 2015, seed: int = 0) -> dict:
+    """
+        {"market_data": [...]} for `years` years from January of `start_year`.
+    """
+    rng = np.random.default_rng(seed)
+    cpi, unemployment, lower = 2.0, 5.0, 0.25
+    months = []
+    for position in range(years * 12):
+        label = f"{MONTHS[position % 12]} {start_year + position // 12}"
+        cpi = round(float(np.clip(cpi + rng.normal(0, 0.3), -1, 10)), 1)
+        unemployment = round(float(np.clip(unemployment + rng.normal(0, 0.15), 3, 10)), 1)
+        change_bp = int(rng.choice([-50, -25, 0, 0, 0, 25, 25, 50]))
+        change_bp = max(change_bp, -int(lower * 100))
+        statement = fed_decision(lower, change_bp)
+        lower += change_bp / 100
+        company, theme = rng.choice(COMPANIES), rng.choice(THEMES)
+        months.append({
+            "month": label,
+            "news": {
+                "summary": f"Markets in {label} were driven by {theme}. {company} led the moves as investors "
+                           f"weighed CPI at {cpi}% and unemployment at {unemployment}%. " * 3,
+                "headlines": [
+                    f"{company} shares move sharply as {theme} dominates {label}.",
+                    f"Inflation prints {cpi}% year on year.",
+                    f"Unemployment rate at {unemployment}%.",
+                    statement,
+                    f"Investors rotate on {theme}.",
+                ],
+            },
+            "economic_indicators": {
+                "cpi_yoy": cpi,
+                "unemployment_rate": unemployment,
+                "fed_interest_rate_decision": statement,
+            },
+        })
+    return {"market_data": months}
+
+def write(directory: str, years: int = 3, seed: int = 0) -> str:
+    """
+        Writes the synthetic data to `directory`/market_data.json, returns its path.
+    """
+    path = os.path.join(directory, "market_data.json")
+    with open(path, "w") as f:
+        json.dump(generate(years, seed=seed), f)
+    return path
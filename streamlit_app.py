@@ -6,20 +6,70 @@ import tempfile
 from datetime import date
 
 # We’ll import both your existing monthly runner and the full-run entrypoint:
-from app.main import run__monthly_workflow, initial_state, data
-from app.main import backtest_simulation, NUM_MONTHS
-from app.types import Report
+# (both are lazy: the data and graph are only loaded on first use)
+from app.main import get_initial_state
+from app.main import backtest_simulation, num_months
+from app.types import HumanApproval, Report
+from app import approvals, engine, metrics
+from app.config import get_settings
 from fpdf import FPDF
 
 st.set_page_config(page_title="StratifyAI Demo", layout="wide")
 st.title("📊 StratifyAI: Multi-Agent Portfolio Allocator")
 
+
+@st.cache_resource
+def get_engine() -> engine.SimulationEngine:
+    # one engine per server: runs outlive page reruns, and are shared by every session
+    return engine.get_engine()
+
+def describe(update) -> str:
+    """
+    One line for a node's state update: the splits and verdicts it produced.
+    """
+    if not isinstance(update, dict):
+        return "done"
+    parts = []
+    for key, value in update.items():
+        if isinstance(value, Report):
+            parts.append(f"{key}: {value.equities:.2f} equities / {value.bonds:.2f} bonds")
+        elif hasattr(value, "verdict"):
+            parts.append(f"{key}: {value.verdict.value}")
+        elif isinstance(value, (str, int, float)) or hasattr(value, "value"):
+            parts.append(f"{key}: {getattr(value, 'value', value)}")
+    return ", ".join(parts) or "done"
+
+def event_lines(events: list) -> list:
+    lines = []
+    for event in events:
+        if event["type"] == "node" and event["node"] == "__interrupt__":
+            lines.append(f"{event['month']} · paused, awaiting human approval")
+        elif event["type"] == "node":
+            lines.append(f"{event['month']} · {event['node']} · {describe(event['update'])}")
+        else:
+            lines.append(
+                f"{event['month']} · booked {event['equities']:.2f} / {event['bonds']:.2f}, "
+                f"capital {event['capital']:,.2f}" + (" (awaiting approval)" if event["awaiting_approval"] else "")
+            )
+    return lines
+
+@st.fragment(run_every=1)
+def live_progress(key: str):
+    # polls the background run; only this fragment reruns, the rest of the page stays put
+    job = get_engine().get(key)
+    if job is None:
+        return
+    if job.done:
+        st.rerun()
+    st.progress(job.months_done / job.months_to_run, text=f"{job.status}: {job.months_done}/{job.months_to_run} months")
+    st.code("\n".join(event_lines(job.events())[-20:]) or "waiting for the first node…")
+
 # ---- Sidebar controls ----
 st.sidebar.header("Simulation Controls")
 mode = st.sidebar.selectbox("Mode", ["Live Allocation", "Historical Backtest"])
 
 # How many months of data do we have?
-months_count = NUM_MONTHS
+months_count = num_months()
 
 # If you have >1 month, show a slider. Otherwise default to 1.
 if months_count > 1:
@@ -33,48 +83,58 @@ if months_count > 1:
 else:
     months_to_run = 1
 
+reports = {}
+
 # ---- Live Allocation ----
 if mode == "Live Allocation":
     st.header("🚀 Live Allocation (Today)")
 
-    if st.button("Run Allocation"):
-        # initialize progress bar and state
-        progress = st.sidebar.progress(0)
-        state = initial_state
-
-        log_lines = []
-        reports = {}
-
-        # run month by month, streaming progress
-        for idx in range(months_to_run):
-            # update progress bar
-            progress.progress((idx + 1) / months_to_run)
-
-            # invoke your per-month workflow
-            state = run__monthly_workflow(state)
-
-            # capture logs from your logger (assuming you push them into SharedState)
-            if "log" in state:
-                log_lines.extend(state["log"])
+    defaults = get_initial_state()
+    c1, c2 = st.columns(2)
+    capital = c1.number_input("Starting capital", min_value=0.0, value=float(defaults["capital"]))
+    equities = c2.slider("Starting equities", min_value=0.0, max_value=1.0, value=float(defaults["prev_equity_allocation"]))
+    initial_state = {"capital": capital, "prev_equity_allocation": equities, "prev_bond_allocation": round(1 - equities, 4)}
 
-        # once done, extract final reports & logs
-        # assuming your SharedState contains a dict of Reports under 'reports'
-        reports = state.get("reports", {})
-        log_lines = state.get("log", log_lines)
+    if st.button("Run Allocation"):
+        # runs in the background, checkpointed, so Warn/Block months queue for approval
+        # below instead of blocking; a run with the same parameters is joined, or shown
+        # straight from the cache if it already finished
+        st.session_state["run_key"] = get_engine().submit(months_to_run, initial_state).key
+
+    job = get_engine().get(st.session_state["run_key"]) if "run_key" in st.session_state else None
+    if job is not None and not job.done:
+        live_progress(job.key)
+    elif job is not None and job.status == "failed":
+        st.error(f"Run failed: {job.error}")
+    elif job is not None:
+        state = job.result["final_state"]
+        reports = {
+            "Quant": state.get("quant_report"),
+            "Analyst": state.get("analyst_report"),
+            "CIO": state.get("CIO_report"),
+        }
+        reports = {name: rpt for name, rpt in reports.items() if rpt is not None}
 
         # display them
-        cols = st.columns(len(reports))
-        for col, (agent_name, rpt) in zip(cols, reports.items()):
-            col.subheader(agent_name)
-            col.json(rpt.dict() if isinstance(rpt, Report) else rpt)
+        if reports:
+            cols = st.columns(len(reports))
+            for col, (agent_name, rpt) in zip(cols, reports.items()):
+                col.subheader(agent_name)
+                col.json(rpt.model_dump() if isinstance(rpt, Report) else rpt)
 
-        st.markdown(f"## ⚠️ Risk Agent Decision: **{reports['Risk'].decision}**")
+        if state.get("risk_report") is not None:
+            st.markdown(f"## ⚠️ Risk Agent Decision: **{state['risk_report'].verdict.value}**")
+        st.dataframe(job.result["allocations"], use_container_width=True)
+
+        lines = event_lines(job.events())
+        with st.expander("Node events"):
+            st.code("\n".join(lines))
 
         # write out logs
         with open("logs/last_run.log", "w") as f:
-            f.write("\n".join(log_lines))
+            f.write("\n".join(lines))
 
-        st.success("✅ Allocation complete!")
+        st.success(f"✅ Allocation complete! ({job.finished_at - job.submitted_at:.1f}s)")
 
 # ---- Historical Backtest ----
 else:
@@ -94,6 +154,64 @@ else:
         st.line_chart(bt_results["equity_curve"])
         st.json(bt_results["metrics"])
 
+# ---- Pending Approvals ----
+st.markdown("---")
+st.subheader("👱‍♂️ Pending Approvals")
+pending = approvals.get_approval_queue().pending()
+if not pending:
+    st.caption("No allocations are waiting for approval.")
+for request in pending:
+    st.markdown(
+        f"**{request['month']}**: risk verdict **{request['verdict']}**. "
+        f"Proposed {request['equities']} equities / {request['bonds']} bonds "
+        f"(previously {request['prev_equities']} / {request['prev_bonds']})"
+    )
+    st.caption(request["reason"])
+    approve_col, reject_col = st.columns(2)
+    if approve_col.button("Approve", key=f"approve-{request['thread_id']}"):
+        approvals.decide(request["thread_id"], HumanApproval.approve)
+        st.rerun()
+    if reject_col.button("Reject", key=f"reject-{request['thread_id']}"):
+        approvals.decide(request["thread_id"], HumanApproval.reject)
+        st.rerun()
+
+# ---- Run Metrics ----
+st.markdown("---")
+st.subheader("⏱️ Run Metrics")
+last_run = metrics.load(metrics.metrics_dir(get_settings().cache_dir))
+if last_run is None:
+    st.caption("No run metrics yet, run a simulation first.")
+else:
+    totals = last_run["totals"]
+    st.caption(f"Run {last_run['run_id']} took {last_run['wall_seconds']:.1f}s")
+    c1, c2, c3, c4, c5, c6 = st.columns(6)
+    c1.metric("LLM round trips", totals["llm_round_trips"])
+    c2.metric("LLM calls avoided", totals.get("llm_calls_avoided", 0))
+    c3.metric("Prompt tokens", totals["prompt_tokens"])
+    c4.metric("Prompt tokens saved", totals.get("prompt_tokens_saved", 0))
+    c5.metric("Completion tokens", totals["completion_tokens"])
+    c6.metric("Retries", sum(last_run["retries"].values()))
+    rows = []
+    for month in last_run["months"]:
+        for node, scope in month["nodes"].items():
+            caches = scope["caches"].values()
+            lookups = sum(cache["hits"] + cache["misses"] for cache in caches)
+            rows.append({
+                "month": month["month"],
+                "node": node,
+                "seconds": round(scope["seconds"], 3),
+                "LLM round trips": scope["llm_round_trips"],
+                "LLM seconds": round(scope["llm_seconds"], 3),
+                "LLM calls avoided": scope.get("llm_calls_avoided", 0),
+                "prompt tokens": scope["prompt_tokens"],
+                "prompt tokens saved": scope.get("prompt_tokens_saved", 0),
+                "completion tokens": scope["completion_tokens"],
+                "tool calls": sum(tool["calls"] for tool in scope["tools"].values()),
+                "cache hit rate": round(sum(cache["hits"] for cache in caches) / lookups, 2) if lookups else None,
+                "rate limit wait (s)": round(scope["rate_limit_wait_seconds"], 3),
+            })
+    st.dataframe(rows, use_container_width=True)
+
 # ---- Audit Log & PDF Export ----
 st.markdown("---")
 st.subheader("📝 Audit Log")
@@ -112,7 +230,7 @@ if st.button("Export PDF"):
         pdf.add_page()
         pdf.set_font("Arial", size=14)
         pdf.cell(0, 10, "StratifyAI CIO Report", ln=True, align="C")
-        for line in cio.summary.split("\n"):
+        for line in cio.justification.split("\n"):
             pdf.multi_cell(0, 8, line)
         tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
         pdf.output(tmp.name)